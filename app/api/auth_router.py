@@ -1,5 +1,6 @@
 # app/routers/auth_router.py
 from fastapi import APIRouter, Depends, Response, HTTPException
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from uuid import uuid4
 from app.models.schema import SignInModel, SignUpModel
@@ -13,19 +14,21 @@ app = app_instance
 
 
 @router.post("/signup")
-def signup(user: SignUpModel):
-    if app_context.db_manager.user_exists(user.user_name):
+async def signup(user: SignUpModel):
+    if await app_context.db_manager.auser_exists(user.user_name):
         raise HTTPException(status_code=409, detail="Username already exists")
-    user.password = hash_password(user.password)                            
-    new_user = app_context.db_manager.create_user(user)
+    # bcrypt is deliberately slow; keep it off the event loop
+    user.password = await run_in_threadpool(hash_password, user.password)
+    new_user = await app_context.db_manager.acreate_user(user)
     return {"message": "User registered successfully", "user_id": new_user["id"]}
 
 @router.post("/signin")
-def signin(user: SignInModel, response: Response):
-    if not app_context.db_manager.user_exists(user.user_name):
+async def signin(user: SignInModel, response: Response):
+    password_hash = await app_context.db_manager.aget_password_hash(user.user_name)
+    if password_hash is None:
         raise HTTPException(status_code=409, detail="Username not exists")
     
-    if not verify_password(user.password, app_context.db_manager.get_password_hash(user.user_name)):
+    if not await run_in_threadpool(verify_password, user.password, password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     token = create_access_token({"sub": user.user_name, "id": user.user_name})
@@ -36,6 +39,6 @@ def signin(user: SignInModel, response: Response):
     return {"message": "Login successful"}
 
 @router.post("/signout")
-def signout(response: Response):
+async def signout(response: Response):
     response.delete_cookie("access_token")
     return {"message": "Logged out"}
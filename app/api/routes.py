@@ -1,14 +1,16 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Body
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
+import json
  
-from app.core.app_instance import app_instance
+from app.core.app_instance import app_instance, job_manager
 from app.core.app_context import app_context
 from app.models.schema import PromptSchema
 from app.utils.auth import *
-from app.utils.exceptions import SessionLimitReachedException
+from app.utils.exceptions import SessionLimitReachedException, JobQueueFullException, PromptLimitReachedException
+from app.services.render_workspace import QUALITY_PRESETS
 app = app_instance
 
 router = APIRouter()
@@ -27,7 +29,7 @@ class SessionIdSchema(BaseModel):
 
 
 @router.post("/create-session")
-def create_session(
+async def create_session(
     request: SessionSchema,
     user: User = Depends(get_current_user)
 ):
@@ -36,7 +38,7 @@ def create_session(
         raise HTTPException(
             status_code=400, detail="Session name cannot be empty")
     try:
-        session_data = app_context.db_manager.create_session(session_name, user.id)
+        session_data = await app_context.memory_manager.acreate_session(session_name, user.id)
         return {"success": True, "session": session_data}
     
     except ValueError as ve:
@@ -49,13 +51,13 @@ def create_session(
         raise HTTPException(status_code=500, detail="Internal server error.")
 
 @router.get("/sessions")
-def get_sessions(
+async def get_sessions(
     user: User = Depends(get_current_user)
 ):
     """
     Fetch all sessions for the current user.
     """
-    sessions = app_context.db_manager.get_user_sessions(user_id=user.id)
+    sessions = await app_context.db_manager.aget_user_sessions(user_id=user.id)
     if not sessions:
         raise HTTPException(status_code=404, detail="No sessions found")
 
@@ -66,7 +68,7 @@ def get_sessions(
 
 
 @router.post("/generate")
-def generate_video(
+async def generate_video(
     request: PromptSchema,
     user: User = Depends(get_current_user)
 ):
@@ -77,14 +79,125 @@ def generate_video(
             status_code=400, detail="Session ID cannot be empty")
     if not prompt:
         raise HTTPException(status_code=400, detail="Prompt cannot be empty")
-    app.set_prompt(prompt)
+    if request.quality and request.quality not in QUALITY_PRESETS:
+        raise HTTPException(
+            status_code=400, detail=f"Quality must be one of: {', '.join(QUALITY_PRESETS)}")
+
+    try:
+        job = job_manager.submit(session_id=session_id, user_id=user.id, prompt=prompt, quality=request.quality)
+    except JobQueueFullException as jqe:
+        raise HTTPException(status_code=503, detail=str(jqe))
 
-    response = app.generate_script(session_id, user.id)
     return {
         "message": "Video generation started",
         "prompt": prompt,
-        "response": response["script_cleaned"],
-        "filename": response["filename"]
+        "job_id": job.id,
+        "status": job.status
+    }
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/generate/stream")
+async def generate_video_stream(
+    request: PromptSchema,
+    user: User = Depends(get_current_user)
+):
+    """
+    Like /generate, but streams the LLM reply as Server-Sent Events:
+    `token` events while the model writes, a `preflight` event as soon as the code block
+    closes, then a `job` event with the render job to poll (or an `error` event).
+    """
+    prompt = request.prompt
+    session_id = request.session_id
+    if not session_id:
+        raise HTTPException(
+            status_code=400, detail="Session ID cannot be empty")
+    if not prompt:
+        raise HTTPException(status_code=400, detail="Prompt cannot be empty")
+    if request.quality and request.quality not in QUALITY_PRESETS:
+        raise HTTPException(
+            status_code=400, detail=f"Quality must be one of: {', '.join(QUALITY_PRESETS)}")
+
+    async def events():
+        script = None
+        try:
+            async for event, data in app.astream_script(session_id=session_id, user_id=user.id, prompt=prompt):
+                if event == "script":
+                    script = data["script"]
+                    continue
+                yield sse_event(event, data)
+
+            job = job_manager.submit(session_id=session_id, user_id=user.id, prompt=prompt,
+                                     quality=request.quality, script=script)
+            yield sse_event("job", {"job_id": job.id, "status": job.status})
+        except (JobQueueFullException, SessionLimitReachedException, PromptLimitReachedException, ValueError) as e:
+            yield sse_event("error", {"detail": str(e)})
+        except Exception:
+            yield sse_event("error", {"detail": "Internal server error."})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    user: User = Depends(get_current_user)
+):
+    """
+    Poll a generation job. Once completed, carries the script and video filename.
+    If the preview was rendered below the final settings (a higher requested quality, or the
+    cheaper preview frame rate), `filename` first points at the preview and is swapped to the
+    final render once `upgrade_status` is "completed".
+    """
+    job = job_manager.get_job(job_id=job_id, user_id=user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    response = {
+        "job_id": job.id,
+        "status": job.status,
+        "prompt": job.prompt
+    }
+    if job.result:
+        response["response"] = job.result.get("script_cleaned")
+        response["filename"] = job.result.get("filename")
+        response["attempts"] = job.result.get("attempts")
+        response["quality"] = job.result.get("quality")
+        response["preview_filename"] = job.result.get("preview_filename")
+    if job.upgrade_status:
+        response["upgrade_status"] = job.upgrade_status
+        if job.upgrade_error:
+            response["upgrade_error"] = job.upgrade_error
+    if job.error:
+        response["error"] = job.error
+    return response
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(
+    job_id: str,
+    user: User = Depends(get_current_user)
+):
+    """
+    Cancel a queued or running job. A render in progress is killed; a finished
+    preview stays available, only its pending quality upgrade is dropped.
+    """
+    job = job_manager.cancel(job_id=job_id, user_id=user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "message": "Cancellation requested",
+        "job_id": job.id,
+        "status": job.status,
+        "upgrade_status": job.upgrade_status
     }
 
 
@@ -102,7 +215,7 @@ async def get_video(req: VideoSchema = Body(...)):
 
 
 @router.post("/delete-session")
-def delete_session(
+async def delete_session(
     request: SessionIdSchema,
     user: User = Depends(get_current_user)
 ):
@@ -111,7 +224,7 @@ def delete_session(
         raise HTTPException(
             status_code=400, detail="Session ID cannot be empty")
 
-    app_context.db_manager.delete_session(
+    await app_context.memory_manager.adelete_session(
         session_id=session_id, user_id=user.id)
     return {
         "message": "Session deleted successfully"
@@ -1,22 +1,94 @@
 # config.py
-from dataclasses import dataclass
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
 
 @dataclass
 class DatabaseConfig:
     postgres_url: str
+    async_pool_size: int = 10  # connections of the asyncio engine used by the request path
 
 @dataclass  
 class RedisConfig:
     host: str = "localhost"
     port: int = 6379
     db: int = 0
+    max_connections: int = 100  # asyncio connection pool size
+    session_cache_ttl: int = 60             # seconds a session's owner stays in the in-process cache
+    session_cache_max_entries: int = 10000
+
+
+# Expressions compiled into the shared Tex cache when the server starts
+DEFAULT_TEX_CORPUS = [
+    r"\frac{a}{b}", r"\sum_{i=1}^{n} i", r"\int_a^b f(x)\,dx", r"\lim_{x \to \infty}",
+    r"\sqrt{x}", r"x^2", r"e^{i\pi} + 1 = 0", r"a^2 + b^2 = c^2", r"\infty",
+    r"\alpha", r"\beta", r"\gamma", r"\delta", r"\theta", r"\lambda", r"\mu", r"\pi", r"\sigma",
+    r"\rightarrow", r"\leftarrow", r"\Rightarrow", r"\leq", r"\geq", r"\neq", r"\approx", r"\times",
+    r"n!", r"O(n)", r"O(n^2)", r"O(\log n)", r"O(n \log n)",
+]
+
+
+@dataclass
+class RenderConfig:
+    max_workers: int = 2          # concurrent render jobs
+    max_upgrade_workers: int = 1  # concurrent final-quality upgrades, on top of max_workers
+    max_pending_jobs: int = 50    # queued + running jobs before /generate rejects
+    job_ttl: int = 3600           # seconds a finished job stays pollable
+    quality: str = "l"            # manim -q flag for the first (preview) render: l | m | h | p | k
+    preview_frame_rate: Optional[int] = 10  # cheaper previews; None keeps the preset's rate
+    dry_run_first: bool = True    # run construct() with animations skipped before the real encode
+    workspace_root: Optional[str] = None  # parent dir for per-job render workspaces (None = system temp)
+    max_parallel_scenes: int = 4  # scenes of one script rendered concurrently
+    tex_cache_dir: str = "cache/tex"  # compiled LaTeX shared by every render worker
+    tex_cache_max_bytes: int = 512 * 1024 ** 2
+    tex_warmup_expressions: List[str] = field(default_factory=lambda: list(DEFAULT_TEX_CORPUS))
+    cache_dir: str = "cache/renders"
+    cache_max_bytes: int = 2 * 1024 ** 3
+    use_worker_pool: bool = True  # render on warm manim processes instead of the CLI
+    worker_max_jobs: int = 50     # renders before a worker is recycled
+    worker_max_rss_mb: int = 1500 # RSS before a worker is recycled
+    render_timeout: int = 180     # wall-clock seconds per scene render before it is killed
+    render_cpu_seconds: int = 300 # CPU seconds per scene render (RLIMIT_CPU)
+    render_memory_mb: int = 4096  # address space per render process (RLIMIT_AS)
+    # The three limits above are for preview settings; renders at costlier settings get them scaled up
+    output_tail_lines: int = 200  # manim CLI output kept for error reports (ring buffer)
+    repair_mode: str = "diff"     # LLM repairs as "diff" (falls back to full) or "full" script regeneration
+    speculative_candidates: int = 1  # >1: generate this many scripts at once, keep the first that renders
+
+
+@dataclass
+class PromptCacheConfig:
+    enabled: bool = False         # opt-in: results ignore per-session context
+    ttl: int = 24 * 3600          # seconds
+    max_entries: int = 1000
+
+
+@dataclass
+class ContextConfig:
+    max_history_tokens: int = 4000  # history sent verbatim to the LLM per call
+    min_recent_messages: int = 2    # always kept verbatim, even over budget
+    summary_max_tokens: int = 300   # length of the rolling summary of older turns
+    summary_input_tokens: int = 400 # per-message cap when feeding the summarizer
+
+
+@dataclass
+class WriteBehindConfig:
+    enabled: bool = False         # opt-in: chat messages reach Postgres from a Redis Stream, off the request path
+    stream: str = "chat:messages"
+    group: str = "chat-persister"
+    consumer: Optional[str] = None  # defaults to the host name, so a restarted server replays its own pending entries
+    batch_size: int = 200         # messages per multi-row INSERT
+    block_ms: int = 1000          # XREADGROUP wait when the stream is empty
+    claim_idle_ms: int = 60000    # unacknowledged entries older than this are retried (XAUTOCLAIM)
 
 
 @dataclass
 class AppConfig:
     database: DatabaseConfig
     redis: RedisConfig
+    render: RenderConfig = field(default_factory=RenderConfig)
+    prompt_cache: PromptCacheConfig = field(default_factory=PromptCacheConfig)
+    context: ContextConfig = field(default_factory=ContextConfig)
+    write_behind: WriteBehindConfig = field(default_factory=WriteBehindConfig)
     sync_interval: int = 300  # seconds
 
 # Example configuration
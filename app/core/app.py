@@ -1,12 +1,30 @@
 import os
+import math
 import json
 import re
 import shutil
+import threading
+import time
+import signal
 import subprocess
 import logging
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from contextlib import ExitStack
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from starlette.concurrency import run_in_threadpool
 from app.core.app_context import app_context
+from app.utils.file_manager import atomic_copy
+from app.utils.exceptions import RenderCancelledException, ScriptValidationError, PatchApplyError
+from app.utils.process_limits import limited_command, kill_process_group
+from app.services.render_errors import RenderError, OutputTail
+from app.services.script_preflight import ScriptPreflight
+from app.services.script_autofix import ScriptAutoFixer
+from app.services.render_workspace import QUALITY_PRESETS, RenderWorkspace, render_cost
+from app.utils.video_concat import concat_videos
+from app.utils.patch import apply_unified_diff, extract_diff
+from app.utils.system_prompt import REPAIR_DIFF_PROMPT
+from app.utils.code_stream import FencedCodeExtractor
 
 # Configure module-level logger
 logger = logging.getLogger(__name__)
@@ -21,17 +39,141 @@ if not logger.handlers:
 
 
 class App:
-    def __init__(self, max_retry_attempts: int = 3):
+    def __init__(self, max_retry_attempts: int = 3, max_repair_error_chars: int = 4000):
         self._chatapp = app_context.chat_application
         self.prompt = app_context.system_prompt
         self.max_retry_attempts = max_retry_attempts
+        self.max_repair_error_chars = max_repair_error_chars
+        self.output_tail_lines = app_context.config.render.output_tail_lines
+        self.repair_mode = app_context.config.render.repair_mode
+        self.render_cache = app_context.render_cache
+        self.prompt_cache = app_context.prompt_cache
+        self.worker_pool = app_context.worker_pool
+        self.preflight = ScriptPreflight()
+        self.autofixer = ScriptAutoFixer()
+        self.quality = app_context.config.render.quality
+        self.preview_frame_rate = app_context.config.render.preview_frame_rate
+        self.dry_run_first = app_context.config.render.dry_run_first
+        self.workspace_root = app_context.config.render.workspace_root
+        self.max_parallel_scenes = app_context.config.render.max_parallel_scenes
+        self.tex_cache = app_context.tex_cache
+        self.render_timeout = app_context.config.render.render_timeout
+        self.render_cpu_seconds = app_context.config.render.render_cpu_seconds
+        self.render_memory_mb = app_context.config.render.render_memory_mb
+        self.speculative_candidates = app_context.config.render.speculative_candidates
     
     def set_prompt(self, prompt: str):
         self.prompt = prompt
 
-    def run_script(self, script_path: str) -> Tuple[bool, Optional[str]]:
+    def render_limits(self, workspace: RenderWorkspace) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+        """
+        Timeout, CPU seconds and memory for one scene render in the workspace.
+        The configured limits hold for preview settings; costlier settings scale them by the
+        extra encode work (time) and pixels per frame (memory), so a 1080p60 upgrade is not
+        killed by a limit sized for a 480p preview.
+        """
+        preview_height = QUALITY_PRESETS[self.quality][0]
+        height = QUALITY_PRESETS[workspace.quality][0]
+        work = render_cost(workspace.quality, workspace.frame_rate) / render_cost(self.quality, self.preview_frame_rate)
+        pixels = (height / preview_height) ** 2
+        def scale(limit, factor):
+            return math.ceil(limit * max(1.0, factor)) if limit else limit  # 0/None stays unlimited
+
+        return (scale(self.render_timeout, work), scale(self.render_cpu_seconds, work),
+                scale(self.render_memory_mb, pixels))
+
+    def run_scene(self, script_path: str, class_name: str, workspace: RenderWorkspace,
+                  dry_run: bool = False) -> Tuple[bool, Optional[str]]:
+        """
+        Render a single Scene class of a script.
+        Each render is bounded by a wall-clock timeout, CPU time and memory (see render_limits);
+        exceeding them fails the render with a RenderError the repair loop can act on.
+        Raises RenderCancelledException when the workspace's job was cancelled.
+        
+        Returns:
+            Tuple[bool, Optional[str]]: (success, error_message)
+        """
+        if self.worker_pool and not workspace.background:
+            success, error_msg, stats = self.worker_pool.render(
+                script_path, workspace.quality, scene_names=[class_name],
+                media_dir=str(workspace.media_dir), dry_run=dry_run, frame_rate=workspace.frame_rate,
+                tex_dir=str(self.tex_cache.cache_dir), cancel_event=workspace.cancel_event
+            )
+            if workspace.cancelled:
+                raise RenderCancelledException(f"Render of {class_name} was cancelled")
+            workspace.record_stats(stats)
+            return success, error_msg
+
+        command = ["manim", "--dry_run", f"-q{workspace.quality}"] if dry_run else ["manim", f"-q{workspace.quality}"]
+        if workspace.frame_rate:
+            command += ["--frame_rate", str(workspace.frame_rate)]
+        # tex_dir has no CLI flag; point manim at the shared Tex cache through a config file
+        config_file = workspace.path / "manim.cfg"
+        if not config_file.exists():
+            config_file.write_text(f"[CLI]\ntex_dir = {self.tex_cache.cache_dir}\n", encoding="utf-8")
+        command += ["--config_file", str(config_file), "--media_dir", str(workspace.media_dir), script_path, class_name]
+        timeout, cpu_seconds, memory_mb = self.render_limits(workspace)
+        # New session so a timeout kills manim together with its latex/ffmpeg children
+        process = subprocess.Popen(
+            limited_command(command, cpu_seconds, memory_mb),
+            env=os.environ.copy(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            start_new_session=True
+        )
+        # Stream output through a bounded tail instead of buffering all of it (progress bars, LaTeX logs)
+        tail = OutputTail(max_lines=self.output_tail_lines)
+        stats = {"partials_reused": 0, "partials_rendered": 0}
+        reader = threading.Thread(target=self._read_output, args=(process.stdout, tail, stats), daemon=True)
+        reader.start()
+
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            try:
+                process.wait(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                if workspace.cancelled:
+                    kill_process_group(process.pid)
+                    process.wait()
+                    raise RenderCancelledException(f"Render of {class_name} was cancelled")
+                if deadline is not None and time.monotonic() > deadline:
+                    kill_process_group(process.pid)
+                    process.wait()
+                    return False, str(RenderError.limit(
+                        "timeout", f"Rendering {class_name} exceeded the {timeout}s wall-clock limit"
+                    ))
+        reader.join()
+
+        workspace.record_stats(stats)
+        if process.returncode == -signal.SIGXCPU:
+            return False, str(RenderError.limit("cpu_limit", f"Rendering {class_name} exceeded its CPU-time limit"))
+        if process.returncode != 0:
+            error = RenderError.from_output(tail, script_path)
+            if error.exception_type == "MemoryError":
+                error = RenderError.limit("memory_limit", f"Rendering {class_name} ran out of memory")
+            return False, str(error)
+        return True, None
+
+    @staticmethod
+    def _read_output(stream, tail: OutputTail, stats: Dict[str, int]) -> None:
+        """Consume a render's output line by line, keeping counters and a bounded tail."""
+        for line in stream:
+            if "Using cached data" in line:
+                stats["partials_reused"] += 1
+            elif "Partial movie file written" in line:
+                stats["partials_rendered"] += 1
+            tail.append(line)
+        stream.close()
+
+    def run_script(self, script_path: str, scene_names: List[str], workspace: RenderWorkspace,
+                   dry_run: bool = False) -> Tuple[bool, Optional[str]]:
         """
         Run a script and return success status and error message if any.
+        Scenes are rendered concurrently, each on its own worker process.
+        With dry_run, construct() runs with animations skipped and nothing is written,
+        which surfaces runtime errors in a fraction of the render time.
         
         Returns:
             Tuple[bool, Optional[str]]: (success, error_message)
@@ -41,100 +183,121 @@ class App:
             logger.error(error_msg)
             return False, error_msg
 
-        logger.info(f"Running Manim script: {script_path}")
-        try:
-            result = subprocess.run(
-                ["manim", "-pql", script_path], 
-                check=True, 
-                env=os.environ.copy(),
-                capture_output=True,
-                text=True
-            )
-            logger.info("Script executed successfully.")
-            
-            # Additional check: verify that the video was actually created
-            # Extract class name from script to check if video exists
-            with open(script_path, 'r', encoding='utf-8') as f:
-                script_content = f.read()
-            
-            match = re.search(r"class\s+(\w+)\s*\(\s*Scene\s*\)\s*:", script_content)
-            if match:
-                class_name = match.group(1)
-                script_filename = os.path.basename(script_path)
-                folder_name = script_filename.replace('.py', '')
-                expected_video_path = Path(f"media/videos/{folder_name}/480p15/{class_name}.mp4")
-                
-                if not expected_video_path.exists():
-                    error_msg = f"Script ran without errors but no video was generated at: {expected_video_path}"
-                    logger.error(error_msg)
-                    return False, error_msg
-            
+        logger.info(f"Running Manim script: {script_path} ({', '.join(scene_names)}){' (dry run)' if dry_run else ''}")
+        with ThreadPoolExecutor(max_workers=min(len(scene_names), self.max_parallel_scenes)) as executor:
+            results = list(executor.map(
+                lambda name: self.run_scene(script_path, name, workspace, dry_run), scene_names
+            ))
+
+        for class_name, (success, error_msg) in zip(scene_names, results):
+            if not success:
+                if len(scene_names) > 1:
+                    error_msg = f"Scene {class_name} failed:\n{error_msg}"
+                logger.error(error_msg)
+                return False, error_msg
+        logger.info("Script executed successfully.")
+        if dry_run:
             return True, None
-        except subprocess.CalledProcessError as e:
-            error_msg = f"Error executing script: {e}\nStdout: {e.stdout}\nStderr: {e.stderr}"
-            logger.error(error_msg)
-            return False, error_msg
+        
+        # Additional check: verify that the videos were actually created
+        for class_name in scene_names:
+            expected_video_path = workspace.video_path(os.path.basename(script_path), class_name)
+            if not expected_video_path.exists():
+                error_msg = f"Script ran without errors but no video was generated at: {expected_video_path}"
+                logger.error(error_msg)
+                return False, error_msg
+        
+        return True, None
 
-    def move_rendered_video(self, class_name: str, script_filename: str):
+    def move_rendered_video(self, scene_names: List[str], script_filename: str, workspace: RenderWorkspace) -> Path:
         """
-        Move rendered video from Manim's output directory to static folder.
+        Move rendered video from the job's media directory to static folder.
+        Multiple scenes are stitched into one video in script order, without re-encoding.
         
         Args:
-            class_name: The Scene class name (for final video name)
-            script_filename: The actual script filename used (may include attempt suffix)
+            scene_names: The Scene classes that were rendered, in playback order
+            script_filename: The script filename manim rendered (names the media folder)
+            workspace: The job workspace; its output_id names the published video
         """
-        # Manim creates folder based on script filename (without .py extension)
-        folder_name = script_filename.replace('.py', '')
-        src = Path(f"media/videos/{folder_name}/480p15/{class_name}.mp4")
+        sources = [workspace.video_path(script_filename, name) for name in scene_names]
         dest_folder = Path("static/videos")
         dest_folder.mkdir(parents=True, exist_ok=True)
-        dest = dest_folder / f"{class_name}.mp4"
+        dest = dest_folder / f"{workspace.output_id}.mp4"
 
-        if not src.exists():
-            raise FileNotFoundError(f"Rendered video not found at: {src}")
+        for src in sources:
+            if not src.exists():
+                raise FileNotFoundError(f"Rendered video not found at: {src}")
 
-        shutil.move(str(src), str(dest))
+        if len(sources) == 1:
+            shutil.move(str(sources[0]), str(dest))
+        else:
+            stitched = workspace.path / f"{workspace.output_id}.mp4"
+            concat_videos(sources, stitched)
+            shutil.move(str(stitched), str(dest))
         logger.info(f"Video moved to: {dest}")
+        return dest
 
-    def create_error_correction_prompt(self, original_code: str, error_message: str, attempt_number: int) -> str:
+    def render(self, script_cleaned: str, scene_names: List[str], workspace: RenderWorkspace,
+               skip_dry_run: bool = False) -> Tuple[bool, Optional[str]]:
         """
-        Create a prompt for the LLM to fix the code based on the error.
+        Render a validated script into static/videos/{workspace.output_id}.mp4.
+        Identical scripts (modulo formatting) at the same quality are served from the render cache.
         """
-        return f"""
-The following Manim script failed to execute with an error. Please fix the code and return only the corrected Python code without any explanations or markdown formatting.
+        cache_key = self.render_cache.make_key(script_cleaned, workspace.settings_key)
+        cached_video = self.render_cache.get(cache_key)
+        if cached_video:
+            atomic_copy(cached_video, Path("static/videos") / f"{workspace.output_id}.mp4")
+            return True, None
 
-ORIGINAL CODE:
-{original_code}
+        file_path = self.save_script(script_cleaned, workspace)
+        if self.dry_run_first and not skip_dry_run:
+            success, error_message = self.run_script(file_path, scene_names, workspace, dry_run=True)
+            if not success:
+                return False, error_message
 
-ERROR MESSAGE:
-{error_message}
+        success, error_message = self.run_script(file_path, scene_names, workspace)
+        if not success:
+            return False, error_message
 
-ATTEMPT NUMBER: {attempt_number}/{self.max_retry_attempts}
+        dest = self.move_rendered_video(scene_names, os.path.basename(file_path), workspace)
+        self.render_cache.put(cache_key, dest)
+        return True, None
 
-Requirements:
-1. Fix the specific error mentioned above
-2. Ensure the code follows Manim best practices
-3. The class should inherit from Scene
-4. Return only the corrected Python code without ```python``` blocks
-5. Make sure all imports are included
-6. Test that the logic is sound before responding
+    def create_error_correction_prompt(self, original_code: str, error_message: str, attempt_number: int) -> str:
+        """
+        Create the repair request for the LLM: just the failing code and a compact error.
+        The instructions live in the short repair system prompt.
+        """
+        if len(error_message) > self.max_repair_error_chars:
+            # The end of the output carries the exception; progress bars and logs come first
+            error_message = "..." + error_message[-self.max_repair_error_chars:]
+        return f"""SCRIPT:
+{original_code}
 
-CORRECTED CODE:
+ERROR (attempt {attempt_number}/{self.max_retry_attempts}):
+{error_message}
 """
 
     def fix_script_with_llm(self, script_content: str, error_message: str, session_id: str, user_id: str, attempt_number: int) -> str:
         """
         Use LLM to fix the script based on the error message.
+        Goes through the stateless repair channel: no session history is sent or saved,
+        so retries stay small and do not count against the session's prompt limit.
+        In "diff" repair mode the LLM returns a unified diff that is applied locally;
+        if it does not apply, the full corrected script is requested instead.
         """
         correction_prompt = self.create_error_correction_prompt(script_content, error_message, attempt_number)
         
-        logger.info(f"Attempting to fix script with LLM (attempt {attempt_number}/{self.max_retry_attempts})")
+        logger.info(f"Attempting to fix script with LLM (attempt {attempt_number}/{self.max_retry_attempts}, session '{session_id}')")
+
+        if self.repair_mode == "diff":
+            raw_response = self._chatapp.repair(repair_request=correction_prompt, instructions=REPAIR_DIFF_PROMPT)
+            try:
+                return apply_unified_diff(script_content, extract_diff(raw_response.content))
+            except PatchApplyError as e:
+                logger.warning(f"LLM patch did not apply ({e}), requesting the full script")
         
-        raw_response = self._chatapp.chat(
-            session_id=session_id, 
-            user_id=user_id, 
-            user_input=correction_prompt
-        )
+        raw_response = self._chatapp.repair(repair_request=correction_prompt)
         
         if not raw_response:
             raise ValueError("LLM returned an empty response for error correction.")
@@ -144,35 +307,47 @@ CORRECTED CODE:
 
         corrected_content = raw_response.content
         # Clean any remaining markdown formatting
-        corrected_cleaned = re.sub(r"^```python\s*|\s*```$", "", corrected_content.strip(), flags=re.DOTALL)
+        corrected_cleaned = self.clean_script(corrected_content)
         
         return corrected_cleaned
 
-    def extract_and_validate_script(self, script_content: str) -> Tuple[str, str]:
+    def repair_script(self, script_content: str, error_message: str, session_id: str, user_id: str,
+                      attempt_number: int) -> str:
         """
-        Extract class name and validate the script structure.
+        Fix a failed script, trying the local rule-based fixes before paying for an LLM round-trip.
+        """
+        autofixed = self.autofixer.fix(script_content, error_message)
+        if autofixed:
+            script_content, rules = autofixed
+            logger.info(f"Applied local fixes {rules} (attempt {attempt_number}), auto-fix stats: {self.autofixer.stats()}")
+            return script_content
+        return self.fix_script_with_llm(script_content, error_message, session_id, user_id, attempt_number)
+
+    @staticmethod
+    def clean_script(script_content: str) -> str:
+        """Strip the markdown fences an LLM reply wraps the script in."""
+        return re.sub(r"^```python\s*|\s*```$", "", script_content.strip(), flags=re.DOTALL)
+
+    def extract_and_validate_script(self, script_content: str) -> Tuple[List[str], str]:
+        """
+        Extract Scene class names and validate the script structure.
+        Runs the static preflight checks, so broken scripts reach the repair loop without a render.
         
         Returns:
-            Tuple[str, str]: (class_name, cleaned_script)
+            Tuple[List[str], str]: (scene_names in script order, cleaned_script)
         """
-        script_cleaned = re.sub(r"^```python\s*|\s*```$", "", script_content.strip(), flags=re.DOTALL)
-
-        match = re.search(r"class\s+(\w+)\s*\(\s*Scene\s*\)\s*:", script_cleaned)
-        if not match:
-            raise ValueError("No Manim Scene class found in the script.")
+        script_cleaned = self.clean_script(script_content)
 
-        class_name = match.group(1)
-        return class_name, script_cleaned
+        scene_names = self.preflight.check(script_cleaned)
+        return scene_names, script_cleaned
 
-    def save_script(self, script_content: str, class_name: str, attempt_number: int = 0) -> str:
+    def save_script(self, script_content: str, workspace: RenderWorkspace) -> str:
         """
-        Save script to file with optional attempt number suffix.
+        Save script into the job workspace.
+        Every attempt overwrites the same module, so manim keeps using one media folder and
+        reuses partial movies of animations the fix did not touch.
         """
-        suffix = f"_attempt_{attempt_number}" if attempt_number > 0 else ""
-        filename = f"{class_name}{suffix}.py"
-        
-        os.makedirs("scripts", exist_ok=True)
-        file_path = os.path.join("scripts", filename)
+        file_path = str(workspace.script_path)
 
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(script_content)
@@ -180,46 +355,304 @@ CORRECTED CODE:
         logger.info(f"Script saved to {file_path}")
         return file_path
 
-    def generate_script(self, session_id: str, user_id: str) -> Dict:
+    def serve_from_prompt_cache(self, prompt: str, session_id: str, user_id: str) -> Optional[Dict]:
+        """
+        Answer a repeated prompt from the prompt cache, skipping the LLM and the render.
+        Only fresh sessions are served, since follow-up prompts depend on the history.
+        """
+        cached = self.prompt_cache.get(prompt)
+        if not cached:
+            return None
+
+        if not Path(f"static/videos/{cached['filename']}.mp4").exists():
+            self.prompt_cache.invalidate(prompt)
+            return None
+
+        if self._chatapp.get_history(session_id=session_id, user_id=user_id):
+            return None
+
+        self._chatapp.record_exchange(
+            session_id=session_id,
+            user_id=user_id,
+            user_input=prompt,
+            ai_content=f"```python\n{cached['script_cleaned']}\n```"
+        )
+        return {
+            "script_cleaned": cached["script_cleaned"],
+            "filename": cached["filename"],
+            "attempts": 0,
+            "success": True,
+            "cached": True
+        }
+
+    async def astream_script(self, session_id: str, user_id: str, prompt: str) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Stream the LLM reply as ("token", ...) events. The fenced code block is preflighted as soon
+        as it closes, while the model may still be writing, and reported as a ("preflight", ...) event.
+        Ends with a ("script", ...) event carrying the full script for the render job.
+        """
+        extractor = FencedCodeExtractor()
+        async for text in self._chatapp.astream_chat(session_id=session_id, user_id=user_id, user_input=prompt):
+            yield "token", {"text": text}
+            code = extractor.feed(text)
+            if code is None:
+                continue
+            try:
+                # ast parsing (and the first manim import for the known names) must not block the loop
+                scene_names = await run_in_threadpool(self.preflight.check, code)
+                yield "preflight", {"ok": True, "scenes": scene_names}
+            except ScriptValidationError as e:
+                # Not fatal: the render job's repair loop gets the same error
+                yield "preflight", {"ok": False, "error": str(e)}
+
+        yield "script", {"script": extractor.code if extractor.code is not None else extractor.text}
+
+    def generate_script(self, session_id: str, user_id: str, prompt: Optional[str] = None,
+                        cancel_event: Optional[threading.Event] = None, script_content: Optional[str] = None) -> Dict:
         """
         Generate and execute script with automatic error correction.
+        Pass `prompt` explicitly when running from concurrent jobs; `set_prompt` is shared state.
+        Setting `cancel_event` stops the job: running renders are killed and
+        RenderCancelledException is raised.
+        Pass `script_content` when the script was already generated (e.g. streamed); the LLM is skipped.
         """
-        if not self.prompt:
+        prompt = prompt or self.prompt
+        if not prompt:
             raise ValueError("Prompt not set. Call set_prompt(prompt) before generate_script().")
 
-        # Generate initial script
-        raw_response = self._chatapp.chat(session_id=session_id, user_id=user_id, user_input=self.prompt)
-        logger.debug("Raw LLM response received.")
+        # Serve repeated prompts without touching the LLM or manim
+        fresh_session = False
+        if self.prompt_cache.enabled and script_content is None:
+            cached_result = self.serve_from_prompt_cache(prompt, session_id, user_id)
+            if cached_result:
+                return cached_result
+            fresh_session = not self._chatapp.get_history(session_id=session_id, user_id=user_id)
 
-        if not raw_response:
+        if self.speculative_candidates > 1 and script_content is None:
+            result = self.generate_speculative(prompt, session_id, user_id, cancel_event)
+        else:
+            if script_content is None:
+                # Generate initial script
+                raw_response = self._chatapp.chat(session_id=session_id, user_id=user_id, user_input=prompt)
+                logger.debug("Raw LLM response received.")
+
+                if not raw_response:
+                    raise ValueError("LLM returned an empty response.")
+
+                if isinstance(raw_response, str):
+                    raw_response = json.loads(raw_response)
+
+                script_content = raw_response.content
+
+            # Each job renders in its own workspace, so concurrent jobs never share paths
+            with RenderWorkspace(self.workspace_root, quality=self.quality, frame_rate=self.preview_frame_rate,
+                                 cancel_event=cancel_event) as workspace:
+                result = self.run_with_repairs(script_content, session_id, user_id, workspace)
+                result["quality"] = workspace.quality
+                result["settings_key"] = workspace.settings_key
+                result["render_stats"] = dict(workspace.stats)
+                logger.info(f"Render stats for {workspace.output_id}: {result['render_stats']}")
+        self.tex_cache.prune()
+
+        if result["success"] and result["attempts"] > 1:
+            self.store_repaired_script(session_id, user_id, result["script_cleaned"])
+        if result["success"] and fresh_session:
+            self.prompt_cache.put(prompt, result["script_cleaned"], result["filename"])
+        return result
+
+    def store_repaired_script(self, session_id: str, user_id: str, script_cleaned: str) -> None:
+        """
+        Replace the session's last AI message (the script as the LLM first wrote it) with the
+        repaired script that rendered, so follow-up prompts edit working code.
+        Best effort: the render already succeeded, so a storage error only gets logged.
+        """
+        try:
+            self._chatapp.replace_last_response(session_id=session_id, user_id=user_id, ai_content=script_cleaned)
+        except Exception as e:
+            logger.error(f"Failed to store the repaired script for session {session_id}: {e}")
+
+    def generate_speculative(self, prompt: str, session_id: str, user_id: str,
+                             cancel_event: Optional[threading.Event] = None) -> Dict:
+        """
+        Request several candidate scripts at once, render them concurrently and keep the first that succeeds.
+        - The other candidates are cancelled; only the winner is written to the session history.
+        - If every candidate fails, the first one continues through the usual repair loop, with its
+          failed render counted as the first of max_retry_attempts.
+        """
+        candidates = self._chatapp.generate_candidates(
+            session_id=session_id, user_id=user_id, user_input=prompt, n=self.speculative_candidates
+        )
+        contents = [candidate.content for candidate in candidates if candidate and candidate.content]
+        if not contents:
             raise ValueError("LLM returned an empty response.")
 
-        if isinstance(raw_response, str):
-            raw_response = json.loads(raw_response)
+        with ExitStack() as stack:
+            # Each candidate gets its own workspace and cancel switch
+            workspaces = [
+                stack.enter_context(RenderWorkspace(self.workspace_root, quality=self.quality,
+                                                    frame_rate=self.preview_frame_rate, cancel_event=threading.Event()))
+                for _ in contents
+            ]
+            winner, failures = self.race_candidates(contents, workspaces, cancel_event)
 
-        script_content = raw_response.content
-        
+            if winner is not None:
+                index, script_cleaned = winner
+                self._chatapp.record_exchange(
+                    session_id=session_id, user_id=user_id, user_input=prompt, ai_content=contents[index]
+                )
+                workspace = workspaces[index]
+                result = {
+                    "script_cleaned": script_cleaned,
+                    "filename": workspace.output_id,
+                    "attempts": 1,
+                    "success": True
+                }
+            else:
+                index = min(failures)
+                script_cleaned, error_message = failures[index]
+                logger.warning(f"All {len(contents)} candidates failed, repairing candidate {index + 1}")
+                self._chatapp.record_exchange(
+                    session_id=session_id, user_id=user_id, user_input=prompt, ai_content=contents[index]
+                )
+                workspace = workspaces[index]
+                if cancel_event is not None:
+                    workspace.cancel_event = cancel_event
+                if self.max_retry_attempts > 1:
+                    try:
+                        script_cleaned = self.repair_script(script_cleaned, error_message, session_id, user_id, 1)
+                    except Exception as fix_error:
+                        logger.error(f"Failed to fix script: {fix_error}")
+                    # The candidate's render was attempt 1
+                    result = self.run_with_repairs(script_cleaned, session_id, user_id, workspace, first_attempt=2)
+                else:
+                    result = {
+                        "script_cleaned": script_cleaned,
+                        "filename": "unknown",
+                        "attempts": 1,
+                        "success": False,
+                        "final_error": error_message
+                    }
+
+            result["candidates"] = len(contents)
+            result["quality"] = workspace.quality
+            result["settings_key"] = workspace.settings_key
+            result["render_stats"] = dict(workspace.stats)
+            logger.info(f"Render stats for {workspace.output_id}: {result['render_stats']}")
+        return result
+
+    def race_candidates(self, contents: List[str], workspaces: List[RenderWorkspace],
+                        cancel_event: Optional[threading.Event] = None
+                        ) -> Tuple[Optional[Tuple[int, str]], Dict[int, Tuple[str, str]]]:
+        """
+        Preflight and render candidates concurrently until one succeeds, then cancel the rest.
+
+        Returns:
+            Tuple: ((index, script_cleaned) of the winner or None, {index: (script, error)} of failures)
+        """
+        winner = None
+        failures: Dict[int, Tuple[str, str]] = {}
+        with ThreadPoolExecutor(max_workers=len(contents)) as executor:
+            futures = {
+                executor.submit(self.render_candidate, content, workspace): index
+                for index, (content, workspace) in enumerate(zip(contents, workspaces))
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                if cancel_event is not None and cancel_event.is_set():
+                    for workspace in workspaces:
+                        workspace.cancel_event.set()
+
+                for future in done:
+                    index = futures[future]
+                    try:
+                        success, script_cleaned, error_message = future.result()
+                    except RenderCancelledException:
+                        continue
+                    except Exception as e:
+                        failures[index] = (contents[index], str(e))
+                        continue
+
+                    if success and winner is None:
+                        winner = (index, script_cleaned)
+                        logger.info(f"Candidate {index + 1}/{len(contents)} rendered first, cancelling the rest")
+                        for other, workspace in enumerate(workspaces):
+                            if other != index:
+                                workspace.cancel_event.set()
+                    elif success:
+                        # Finished before its cancellation landed; drop the unused video
+                        (Path("static/videos") / f"{workspaces[index].output_id}.mp4").unlink(missing_ok=True)
+                    else:
+                        failures[index] = (script_cleaned, error_message)
+
+        if winner is None and cancel_event is not None and cancel_event.is_set():
+            raise RenderCancelledException("Job was cancelled")
+        return winner, failures
+
+    def render_candidate(self, script_content: str, workspace: RenderWorkspace) -> Tuple[bool, str, Optional[str]]:
+        """
+        Validate and render one candidate script.
+
+        Returns:
+            Tuple[bool, str, Optional[str]]: (success, script_cleaned, error_message)
+        """
+        try:
+            scene_names, script_cleaned = self.extract_and_validate_script(script_content)
+        except ScriptValidationError as e:
+            # Cleaned, so the repair's local rules can parse it
+            return False, self.clean_script(script_content), str(e)
+
+        success, error_message = self.render(script_cleaned, scene_names, workspace)
+        return success, script_cleaned, error_message
+
+    def render_final_quality(self, script_cleaned: str, output_id: str, quality: str,
+                             cancel_event: Optional[threading.Event] = None) -> Dict:
+        """
+        Re-render a script that already rendered as a preview at the user-selected quality.
+        Runs on the job manager's upgrade worker, through the CLI with limits scaled to the preset;
+        the result is published next to the preview as static/videos/{output_id}_{quality}.mp4
+        so the preview stays valid meanwhile.
+        """
+        scene_names, script_cleaned = self.extract_and_validate_script(script_cleaned)
+        with RenderWorkspace(self.workspace_root, quality=quality, output_id=f"{output_id}_{quality}",
+                             cancel_event=cancel_event, background=True) as workspace:
+            success, error_message = self.render(script_cleaned, scene_names, workspace, skip_dry_run=True)
+        self.tex_cache.prune()
+
+        return {
+            "success": success,
+            "filename": workspace.output_id,
+            "quality": quality,
+            "settings_key": workspace.settings_key,
+            "final_error": error_message
+        }
+
+    def run_with_repairs(self, script_content: str, session_id: str, user_id: str, workspace: RenderWorkspace,
+                         first_attempt: int = 1) -> Dict:
+        """
+        Validate and render a script, asking the LLM to fix it after each failure.
+        Pass `first_attempt` > 1 when the caller already spent attempts on this script (e.g. a
+        failed speculative render and its repair); the job stays within max_retry_attempts renders.
+        """
         # Attempt to run script with retries
-        for attempt in range(self.max_retry_attempts):
+        for attempt in range(first_attempt - 1, self.max_retry_attempts):
+            if workspace.cancelled:
+                raise RenderCancelledException("Job was cancelled")
+            # Without fences, so repairs of scripts that fail preflight can run the local rules
+            script_content = self.clean_script(script_content)
             try:
                 # Extract and validate script
-                class_name, script_cleaned = self.extract_and_validate_script(script_content)
-                
-                # Save script
-                file_path = self.save_script(script_cleaned, class_name, attempt)
+                scene_names, script_cleaned = self.extract_and_validate_script(script_content)
                 
-                # Try to run script
-                success, error_message = self.run_script(file_path)
+                # Render (or reuse a cached render of) the script
+                success, error_message = self.render(script_cleaned, scene_names, workspace)
                 
                 if success:
-                    # Script ran successfully, move video
-                    script_filename = os.path.basename(file_path)
-                    self.move_rendered_video(class_name, script_filename)
                     logger.info(f"Script executed successfully on attempt {attempt + 1}")
                     
                     return {
                         "script_cleaned": script_cleaned,
-                        "filename": class_name,
+                        "filename": workspace.output_id,
                         "attempts": attempt + 1,
                         "success": True
                     }
@@ -227,7 +660,7 @@ CORRECTED CODE:
                     # Script failed, try to fix it
                     if attempt < self.max_retry_attempts - 1:  # Don't fix on last attempt
                         logger.warning(f"Script failed on attempt {attempt + 1}, trying to fix...")
-                        script_content = self.fix_script_with_llm(
+                        script_content = self.repair_script(
                             script_cleaned, 
                             error_message, 
                             session_id, 
@@ -241,18 +674,20 @@ CORRECTED CODE:
                         logger.error(f"Script failed after {self.max_retry_attempts} attempts")
                         return {
                             "script_cleaned": script_cleaned,
-                            "filename": class_name,
+                            "filename": scene_names[0],
                             "attempts": attempt + 1,
                             "success": False,
                             "final_error": error_message
                         }
                         
+            except RenderCancelledException:
+                raise
             except Exception as e:
                 logger.error(f"Attempt {attempt + 1} failed with exception: {e}")
                 if attempt < self.max_retry_attempts - 1:
                     # Try to fix the script
                     try:
-                        script_content = self.fix_script_with_llm(
+                        script_content = self.repair_script(
                             script_content, 
                             str(e), 
                             session_id, 
@@ -6,6 +6,11 @@ from app.services.memory_manager import MemoryManager
 from app.services.chat_service import ChatService
 from app.config.app_config import get_default_config
 from app.services.sync_service import SyncService
+from app.services.message_persister import MessagePersister
+from app.services.render_cache import RenderCache
+from app.services.prompt_cache import PromptCache
+from app.services.manim_worker import ManimWorkerPool
+from app.services.tex_cache import TexCache
 from app.utils.system_prompt import build_prompt
 
 
@@ -14,24 +19,43 @@ class AppContext:
         self.config = get_default_config()
         self.system_prompt = build_prompt()
 
-        self.db_manager = DatabaseManager(self.config.database.postgres_url)
+        self.db_manager = DatabaseManager(
+            self.config.database.postgres_url,
+            async_pool_size=self.config.database.async_pool_size
+        )
 
         self.redis_manager = RedisManager(
             db_manager=self.db_manager,
             host=self.config.redis.host,
             port=self.config.redis.port,
-            db=self.config.redis.db
+            db=self.config.redis.db,
+            max_connections=self.config.redis.max_connections,
+            session_cache_ttl=self.config.redis.session_cache_ttl,
+            session_cache_max_entries=self.config.redis.session_cache_max_entries,
+            write_stream=self.config.write_behind.stream if self.config.write_behind.enabled else None
         )
+        self.message_persister = MessagePersister(
+            redis_manager=self.redis_manager,
+            db_manager=self.db_manager,
+            stream=self.config.write_behind.stream,
+            group=self.config.write_behind.group,
+            consumer=self.config.write_behind.consumer,
+            batch_size=self.config.write_behind.batch_size,
+            block_ms=self.config.write_behind.block_ms,
+            claim_idle_ms=self.config.write_behind.claim_idle_ms
+        ) if self.config.write_behind.enabled else None
 
         self.memory_manager = MemoryManager(
             self.db_manager, self.redis_manager)
 
         self.chat_service = ChatService(
             memory_manager = self.memory_manager,
-            system_prompt=self.system_prompt
+            system_prompt=self.system_prompt,
+            context_config=self.config.context
         )
         self.sync_service = SyncService(
-            memory_manager=self.memory_manager
+            memory_manager=self.memory_manager,
+            sync_interval=self.config.sync_interval
         )
         self.chat_application = ChatApplication(
             db_manager=self.db_manager,
@@ -40,6 +64,28 @@ class AppContext:
             chat_service=self.chat_service,
             sync_service=self.sync_service
         )
+        self.render_cache = RenderCache(
+            cache_dir=self.config.render.cache_dir,
+            max_bytes=self.config.render.cache_max_bytes
+        )
+        self.prompt_cache = PromptCache(
+            system_prompt=self.system_prompt,
+            enabled=self.config.prompt_cache.enabled,
+            ttl=self.config.prompt_cache.ttl,
+            max_entries=self.config.prompt_cache.max_entries
+        )
+        self.worker_pool = ManimWorkerPool(
+            size=self.config.render.max_workers,
+            max_jobs_per_worker=self.config.render.worker_max_jobs,
+            max_rss_mb=self.config.render.worker_max_rss_mb,
+            timeout=self.config.render.render_timeout,
+            cpu_seconds=self.config.render.render_cpu_seconds,
+            memory_mb=self.config.render.render_memory_mb
+        ) if self.config.render.use_worker_pool else None
+        self.tex_cache = TexCache(
+            cache_dir=self.config.render.tex_cache_dir,
+            max_bytes=self.config.render.tex_cache_max_bytes
+        )
         
 
 
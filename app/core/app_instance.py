@@ -1,3 +1,15 @@
 from app.core.app import App
+from app.core.app_context import app_context
+from app.services.job_manager import JobManager
 
 app_instance = App()
+
+job_manager = JobManager(
+    handler=app_instance.generate_script,
+    upgrade_handler=app_instance.render_final_quality,
+    max_workers=app_context.config.render.max_workers,
+    max_pending_jobs=app_context.config.render.max_pending_jobs,
+    job_ttl=app_context.config.render.job_ttl,
+    default_quality=app_context.config.render.quality,
+    max_upgrade_workers=app_context.config.render.max_upgrade_workers
+)
@@ -4,6 +4,7 @@ from app.services.memory_manager import MemoryManager
 from app.services.chat_service import ChatService
 from app.services.sync_service import SyncService
 from app.utils.system_prompt import build_prompt
+from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -37,6 +38,51 @@ class ChatApplication:
 
         return self.chat_service.chat(session_id=session_id, user_id=user_id, user_input=user_input)
 
+    def astream_chat(self, session_id: str, user_id: str, user_input: str):
+        """Send a message and iterate over the response as it is generated (an async iterator)"""
+        if not self.chat_service:
+            raise RuntimeError(
+                "Application not initialized. Call initialize() first.")
+
+        return self.chat_service.astream_chat(session_id=session_id, user_id=user_id, user_input=user_input)
+
+    def generate_candidates(self, session_id: str, user_id: str, user_input: str, n: int):
+        """Get several independent responses without saving any of them"""
+        if not self.chat_service:
+            raise RuntimeError(
+                "Application not initialized. Call initialize() first.")
+
+        return self.chat_service.generate_candidates(
+            session_id=session_id, user_id=user_id, user_input=user_input, n=n)
+
+    def repair(self, repair_request: str, instructions: Optional[str] = None):
+        """Ask for a fixed script (or a diff, depending on `instructions`) without touching any session history"""
+        if not self.chat_service:
+            raise RuntimeError(
+                "Application not initialized. Call initialize() first.")
+
+        if instructions:
+            return self.chat_service.repair(repair_request=repair_request, instructions=instructions)
+        return self.chat_service.repair(repair_request=repair_request)
+
+    def record_exchange(self, session_id: str, user_id: str, user_input: str, ai_content: str):
+        """Store a prompt/response pair that was answered without the LLM"""
+        if not self.chat_service:
+            raise RuntimeError(
+                "Application not initialized. Call initialize() first.")
+
+        self.chat_service.record_exchange(
+            session_id=session_id, user_id=user_id, user_input=user_input, ai_content=ai_content)
+
+    def replace_last_response(self, session_id: str, user_id: str, ai_content: str):
+        """Overwrite the session's last AI message without counting a prompt"""
+        if not self.chat_service:
+            raise RuntimeError(
+                "Application not initialized. Call initialize() first.")
+
+        return self.chat_service.replace_last_response(
+            session_id=session_id, user_id=user_id, ai_content=ai_content)
+
     def get_history(self, session_id: str, user_id: str):
         """Get conversation history"""
         if not self.chat_service:
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router as api_router
 from fastapi.staticfiles import StaticFiles
 from app.api.auth_router import router as auth_router
+from app.core.app_context import app_context
 
 app = FastAPI(
     title="Manim AI Backend",
@@ -23,3 +24,39 @@ app.add_middleware(
 app.include_router(api_router)
 app.include_router(auth_router)
 
+
+@app.on_event("startup")
+def warm_tex_cache():
+    app_context.tex_cache.start_warm_up()
+
+
+@app.on_event("startup")
+def start_worker_pool():
+    # Workers import manim now, so the first render does not pay for it
+    if app_context.worker_pool:
+        app_context.worker_pool.start()
+
+
+@app.on_event("startup")
+def start_message_persister():
+    if app_context.message_persister:
+        app_context.message_persister.start()
+
+
+@app.on_event("startup")
+def start_sync_service():
+    app_context.sync_service.start()
+
+
+@app.on_event("shutdown")
+async def close_async_clients():
+    if app_context.message_persister:
+        app_context.message_persister.stop()
+    await app_context.redis_manager.aclient.aclose()
+    await app_context.db_manager.async_engine.dispose()
+
+
+@app.on_event("shutdown")
+def stop_worker_pool():
+    if app_context.worker_pool:
+        app_context.worker_pool.shutdown()
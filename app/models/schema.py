@@ -1,8 +1,10 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class PromptSchema(BaseModel):
     prompt : str
     session_id : str
+    quality : Optional[str] = None  # manim -q flag for the final render (l | m | h | p | k)
 
 class VideoSchema(BaseModel):
     filename : str
@@ -1,9 +1,12 @@
 import logging
-from typing import List
+from typing import AsyncIterator, List, Optional
 from langchain.schema import AIMessage, HumanMessage, SystemMessage
 
 from app.services.memory_manager import MemoryManager
 from app.core.llm_config import LangchainLLMConfig
+from app.services.context_builder import ContextBuilder
+from app.config.app_config import ContextConfig
+from app.utils.system_prompt import REPAIR_PROMPT
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -14,16 +17,26 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 class ChatService:
-    def __init__(self, memory_manager: MemoryManager, system_prompt: str):
+    def __init__(self, memory_manager: MemoryManager, system_prompt: str, context_config: Optional[ContextConfig] = None):
         self.memory_manager = memory_manager
         self.system_prompt = system_prompt
         self.llm = LangchainLLMConfig().langchain_llm  # LLM initialization
+        # History sent to the LLM stays within a token budget; older turns become a rolling summary
+        context_config = context_config or ContextConfig()
+        self.context_builder = ContextBuilder(
+            redis_manager=memory_manager.redis_manager,
+            llm=self.llm,
+            max_history_tokens=context_config.max_history_tokens,
+            min_recent_messages=context_config.min_recent_messages,
+            summary_max_tokens=context_config.summary_max_tokens,
+            summary_input_tokens=context_config.summary_input_tokens
+        )
 
     def chat(self, session_id: str, user_id: str, user_input: str) -> str:
         """
         Handles a chat interaction:
         - Loads history from Redis or DB
-        - Sends it to the LLM with system prompt
+        - Sends it to the LLM with system prompt, trimmed to the token budget (older turns summarized)
         - Saves both user and AI messages to memory
         """
         logger.info(f"Received user input for session '{session_id}' (user: {user_id})")
@@ -33,7 +46,7 @@ class ChatService:
 
         # Step 2: Construct message chain
         messages = [SystemMessage(content=self.system_prompt)]
-        messages.extend(history)
+        messages.extend(self.context_builder.build(session_id, user_id, history))
         messages.append(HumanMessage(content=user_input))
 
         # Step 3: Call LLM
@@ -47,6 +60,74 @@ class ChatService:
         logger.info(f"AI response saved for session '{session_id}'")
         return response_message
 
+    async def astream_chat(self, session_id: str, user_id: str, user_input: str) -> AsyncIterator[str]:
+        """
+        Same as chat, but yields the reply's text chunks as the LLM produces them.
+        Messages are saved once the stream completes; an abandoned stream saves nothing.
+        """
+        logger.info(f"Received streamed user input for session '{session_id}' (user: {user_id})")
+
+        history = await self.memory_manager.aload_history(session_id=session_id, user_id=user_id)
+
+        messages = [SystemMessage(content=self.system_prompt)]
+        messages.extend(await self.context_builder.abuild(session_id, user_id, history))
+        messages.append(HumanMessage(content=user_input))
+
+        logger.info(f"Streaming LLM response for session '{session_id}'")
+        chunks = []
+        async for chunk in self.llm.astream(messages):
+            if chunk.content:
+                chunks.append(chunk.content)
+                yield chunk.content
+
+        await self.memory_manager.asave_message(session_id=session_id, user_id=user_id, role="human", content=user_input)
+        await self.memory_manager.asave_message(session_id=session_id, user_id=user_id, role="ai", content="".join(chunks))
+        logger.info(f"Streamed AI response saved for session '{session_id}'")
+
+    def generate_candidates(self, session_id: str, user_id: str, user_input: str, n: int) -> List[AIMessage]:
+        """
+        Requests `n` independent completions for the same input, concurrently:
+        - Loads history once and sends the same message chain `n` times
+        - Saves nothing; persist the chosen answer with record_exchange
+        """
+        history = self.memory_manager.load_history(session_id=session_id, user_id=user_id)
+
+        messages = [SystemMessage(content=self.system_prompt)]
+        messages.extend(self.context_builder.build(session_id, user_id, history))
+        messages.append(HumanMessage(content=user_input))
+
+        logger.info(f"Invoking LLM for {n} candidates in session '{session_id}'")
+        return self.llm.batch([messages] * n, config={"max_concurrency": n})
+
+    def repair(self, repair_request: str, instructions: str = REPAIR_PROMPT) -> AIMessage:
+        """
+        Stateless fix request for a failing script:
+        - Sends only short repair `instructions` plus the request (script and error)
+        - Does not load or save session history, so repairs never count against the prompt limit
+        """
+        messages = [SystemMessage(content=instructions), HumanMessage(content=repair_request)]
+        logger.info("Invoking LLM for a stateless script repair")
+        return self.llm.invoke(messages)
+
+    def record_exchange(self, session_id: str, user_id: str, user_input: str, ai_content: str) -> None:
+        """
+        Saves a prompt/response pair without calling the LLM (e.g. a cached answer or a
+        chosen candidate), so the session history and prompt limit stay consistent.
+        """
+        self.memory_manager.save_message(session_id=session_id, user_id=user_id, role="human", content=user_input)
+        self.memory_manager.save_message(session_id=session_id, user_id=user_id, role="ai", content=ai_content)
+        logger.info(f"Recorded exchange for session '{session_id}'")
+
+    def replace_last_response(self, session_id: str, user_id: str, ai_content: str) -> bool:
+        """
+        Overwrites the last AI message of a session (e.g. with the repaired script that rendered),
+        so the next prompt builds on working code. Not an exchange: the prompt limit is unaffected.
+        """
+        replaced = self.memory_manager.replace_last_ai_message(session_id=session_id, user_id=user_id, content=ai_content)
+        logger.info(f"Replaced last AI response for session '{session_id}'" if replaced
+                    else f"No AI response to replace for session '{session_id}'")
+        return replaced
+
     def get_conversation_history(self, session_id: str, user_id: str) -> List:
         """
         Returns full reconstructed conversation history from memory.
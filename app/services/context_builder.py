@@ -0,0 +1,129 @@
+import logging
+from typing import List, Optional, Tuple, Union
+from langchain.schema import AIMessage, HumanMessage, SystemMessage, BaseMessage
+
+from app.services.redis_manager import RedisManager
+from app.utils.tokens import count_tokens
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+SUMMARY_PROMPT = """
+You maintain a running summary of a conversation in which a user asks for Manim animations.
+Update the summary with the new messages. Keep what the user asked for, the visual decisions made
+and any errors or constraints that matter for follow-up requests. Never include code.
+Reply with the updated summary only, in at most {max_tokens} tokens.
+"""
+
+Message = Union[AIMessage, HumanMessage]
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Token count cached with the message in Redis, computed only when missing."""
+    cached = (message.response_metadata or {}).get("tokens")
+    return cached if cached is not None else count_tokens(message.content)
+
+
+def message_seq(message: BaseMessage) -> Optional[int]:
+    """Sequence number the message was stored with in Redis."""
+    return (message.response_metadata or {}).get("seq")
+
+
+class ContextBuilder:
+    def __init__(self, redis_manager: RedisManager, llm, max_history_tokens: int = 4000,
+                 min_recent_messages: int = 2, summary_max_tokens: int = 300, summary_input_tokens: int = 400):
+        """
+        Builds the history part of a prompt within a token budget.
+        - The most recent messages are kept verbatim while they fit `max_history_tokens`.
+        - Older messages are folded into a rolling summary cached in Redis; only messages
+          not yet covered by the cached summary are sent to the LLM to update it.
+        """
+        self.redis_manager = redis_manager
+        self.llm = llm
+        self.max_history_tokens = max_history_tokens
+        self.min_recent_messages = min_recent_messages
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_input_tokens = summary_input_tokens
+
+    def split(self, history: List[Message]) -> Tuple[List[Message], List[Message]]:
+        """Split history into (older messages to summarize, recent messages kept verbatim)."""
+        used = 0
+        cut = len(history)
+        for index in range(len(history) - 1, -1, -1):
+            tokens = message_tokens(history[index])
+            kept = len(history) - index
+            if used + tokens > self.max_history_tokens and kept > self.min_recent_messages:
+                break
+            used += tokens
+            cut = index
+        # Start the verbatim part on a user turn so no reply is left without its request
+        while cut < len(history) and isinstance(history[cut], AIMessage) and len(history) - cut > self.min_recent_messages:
+            cut += 1
+        return history[:cut], history[cut:]
+
+    def build(self, session_id: str, user_id: str, history: List[Message]) -> List[BaseMessage]:
+        older, recent = self.split(history)
+        if not older:
+            return list(recent)
+
+        cached = self.redis_manager.get_summary(session_id=session_id, user_id=user_id)
+        summary, pending = self._pending(cached, older)
+        if pending:
+            response = self.llm.invoke(self._summary_messages(summary, pending))
+            summary = response.content
+            self.redis_manager.set_summary(session_id=session_id, user_id=user_id,
+                                           summary={"text": summary, "last_seq": message_seq(older[-1])})
+        return self._assemble(summary, recent)
+
+    async def abuild(self, session_id: str, user_id: str, history: List[Message]) -> List[BaseMessage]:
+        """Async version of build."""
+        older, recent = self.split(history)
+        if not older:
+            return list(recent)
+
+        cached = await self.redis_manager.aget_summary(session_id=session_id, user_id=user_id)
+        summary, pending = self._pending(cached, older)
+        if pending:
+            response = await self.llm.ainvoke(self._summary_messages(summary, pending))
+            summary = response.content
+            await self.redis_manager.aset_summary(session_id=session_id, user_id=user_id,
+                                                  summary={"text": summary, "last_seq": message_seq(older[-1])})
+        return self._assemble(summary, recent)
+
+    @staticmethod
+    def _pending(cached: Optional[dict], older: List[Message]) -> Tuple[str, List[Message]]:
+        """The cached summary text and the older messages it does not cover yet."""
+        if not cached:
+            return "", older
+        last_seq = cached.get("last_seq")
+        if last_seq is None:
+            return cached["text"], older
+        # Messages trimmed out of the window are simply absent; everything left after last_seq is newer
+        return cached["text"], [message for message in older
+                                if message_seq(message) is None or message_seq(message) > last_seq]
+
+    def _summary_messages(self, summary: str, pending: List[Message]) -> List[BaseMessage]:
+        lines = []
+        for message in pending:
+            content = message.content
+            if message_tokens(message) > self.summary_input_tokens:
+                # Scripts dominate the history; their opening lines are enough to summarize them
+                content = content[:self.summary_input_tokens * 4] + " [...]"
+            lines.append(f"{'User' if isinstance(message, HumanMessage) else 'Assistant'}: {content}")
+        return [
+            SystemMessage(content=SUMMARY_PROMPT.format(max_tokens=self.summary_max_tokens)),
+            HumanMessage(content=f"CURRENT SUMMARY:\n{summary or '(empty)'}\n\nNEW MESSAGES:\n" + "\n\n".join(lines))
+        ]
+
+    @staticmethod
+    def _assemble(summary: str, recent: List[Message]) -> List[BaseMessage]:
+        messages: List[BaseMessage] = []
+        if summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+        messages.extend(recent)
+        return messages
@@ -1,8 +1,12 @@
 import uuid
 import logging
-from typing import List, Optional
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import sessionmaker, Session, selectinload
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.models.db_models import Base, ChatSession, ChatMessage, User
 from app.utils.exceptions import SessionLimitReachedException
 # Set up logging
@@ -14,96 +18,28 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
+def to_async_url(postgres_url: str) -> str:
+    """Turn a psycopg2 URL into its asyncpg equivalent (driver and sslmode -> ssl)."""
+    url = postgres_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url.replace("sslmode=", "ssl=")
+
+
 class DatabaseManager:
-    def __init__(self, postgres_url: str):
+    def __init__(self, postgres_url: str, async_pool_size: int = 10):
         self.engine = create_engine(postgres_url)
         self.SessionLocal = sessionmaker(bind=self.engine)
         Base.metadata.create_all(bind=self.engine)
 
+        # Async engine for the request path; the sync one stays for background threads
+        self.async_engine = create_async_engine(to_async_url(postgres_url), pool_size=async_pool_size)
+        self.AsyncSessionLocal = async_sessionmaker(bind=self.async_engine, expire_on_commit=False)
+
     def get_session(self) -> Session:
         return self.SessionLocal()
-    
-    def create_user(self, user_data) -> dict:
-        db = self.get_session()
-        try:
-            new_user = User(
-                id=str(uuid.uuid4()),
-                user_name=user_data.user_name,
-                password=user_data.password,
-                name=user_data.name
-            )
-            db.add(new_user)
-            db.commit()
-
-            return {
-                "id": new_user.id,
-                "user_name": new_user.user_name,
-                "name": new_user.name
-            }
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Failed to create user: {e}")
-            raise
-        finally:
-            db.close()
 
+    def get_async_session(self) -> AsyncSession:
+        return self.AsyncSessionLocal()
     
-    def user_exists(self,user_name) -> bool:
-        db = self.get_session()
-        try:
-            user = db.query(User).filter_by(user_name=user_name).first()
-            return user is not None
-        except Exception as e:
-            logger.error(f"Error checking user existence: {e}")
-            raise
-    
-    def get_password_hash(self, user_name: str) -> Optional[str]:
-        """Retrieve the hashed password for a user by username"""
-        db = self.get_session()
-        try:
-            user = db.query(User).filter_by(user_name=user_name).first()
-            if not user:
-                logger.warning(f"User {user_name} not found")
-                return None
-            return user.password
-        except Exception as e:
-            logger.error(f"Error retrieving password hash for {user_name}: {e}")
-            raise
-        finally:
-            db.close()
-        
-
-    def create_session(self, session_name: str, user_id: str) -> ChatSession:
-        """Create a new chat session for a user (max 10 sessions allowed)"""
-        db = self.get_session()
-        try:
-            user = db.query(User).filter_by(id=user_id).first()
-            if not user:
-                raise ValueError(f"User with ID {user_id} does not exist.")
-
-            if user.sessions_count >= 10:
-                raise SessionLimitReachedException("Maximum session limit (10) reached for this user.")
-
-            session = ChatSession(id=str(uuid.uuid4()), name = session_name,user_id=user_id)
-            db.add(session)
-            user.sessions_count += 1
-            db.commit()
-
-            logger.info(f"Created chat session {session_name} for user {user_id}")
-            return {
-                "id": session.id,
-                "name": session.name,
-                "user_id": session.user_id,
-                "created_at": session.created_at.isoformat(),
-                "prompts_count": session.prompts_count
-            }
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Failed to create chat session {session_name}: {e}")
-            raise
-        finally:
-            db.close()
-
     def verify_session_ownership(self, db: Session, session_id: str, user_id: str) -> Optional[ChatSession]:
         """Helper: fetch session only if it belongs to the given user"""
         session = db.query(ChatSession).filter_by(id=session_id, user_id=user_id).first()
@@ -121,44 +57,96 @@ class DatabaseManager:
             raise
         finally:
             db.close()
-    def get_user_sessions(self, user_id: str) -> List[ChatSession]:
-        """Retrieve all chat sessions for a user"""
+
+    def append_message(self, session_id: str, user_id: str, role: str, content: str, message_id: str) -> bool:
+        """
+        Store a message whose prompt limit was already enforced (atomically, in Redis).
+        Ownership check and counter increment are one UPDATE, so there is no read-modify-write.
+        `message_id` is the id the message was given in Redis; if the sync already stored it, nothing changes.
+        Returns whether the message was inserted.
+        """
         db = self.get_session()
         try:
-            sessions = db.query(ChatSession).filter_by(user_id=user_id).all()
-            if not sessions:
-                logger.warning(f"No sessions found for user {user_id}")
-            return sessions
+            result = db.execute(
+                update(ChatSession)
+                .where(ChatSession.id == session_id, ChatSession.user_id == user_id)
+                .values(prompts_count=ChatSession.prompts_count + 1)
+            )
+            if result.rowcount == 0:
+                raise ValueError(f"Session {session_id} does not belong to user {user_id}")
+
+            inserted = db.execute(self._insert_message(message_id, session_id, role, content)).first()
+            if inserted is None:
+                db.rollback()
+                return False
+            db.commit()
+
+            logger.info(f"Saved message to session {session_id} for user {user_id}")
+            return True
         except Exception as e:
-            logger.error(f"Error fetching sessions for user {user_id}: {e}")
+            db.rollback()
+            logger.error(f"Failed to save message for session {session_id}, user {user_id}: {e}")
             raise
         finally:
             db.close()
-    
-    def save_message(self, session_id: str, user_id: str, role: str, content: str) -> ChatMessage:
-        """Save a message to a session, verifying ownership and prompt limit"""
+
+    @staticmethod
+    def _insert_message(message_id: str, session_id: str, role: str, content: str):
+        return (
+            pg_insert(ChatMessage)
+            .values(id=message_id, session_id=session_id, role=role, content=content)
+            .on_conflict_do_nothing(index_elements=[ChatMessage.id])
+            .returning(ChatMessage.id)
+        )
+
+    def insert_messages(self, rows: List[Dict[str, str]], replace: bool = False) -> int:
+        """
+        Batch insert of messages persisted outside the request path (write-behind, sync).
+        Rows are dicts with id, session_id, user_id, role, content and an optional ISO timestamp.
+        - One multi-row INSERT ... ON CONFLICT DO NOTHING, so replayed rows are skipped.
+        - `replace` also overwrites the content of rows that already exist (edited messages).
+        - Session prompt counters grow by the rows actually inserted, in the same transaction.
+        - Rows whose session is gone or owned by someone else are dropped.
+        Returns the number of rows inserted.
+        """
         db = self.get_session()
         try:
-            session = self.verify_session_ownership(db, session_id, user_id)
-
-            if session.prompts_count >= 20:
-                raise Exception(f"Session {session_id} has reached the max prompt limit (20)")
+            session_ids = {row["session_id"] for row in rows}
+            owners = dict(db.execute(
+                select(ChatSession.id, ChatSession.user_id).where(ChatSession.id.in_(session_ids))
+            ).all())
+            valid = [row for row in rows if owners.get(row["session_id"]) == row["user_id"]]
+            if len(valid) < len(rows):
+                logger.warning(f"Dropped {len(rows) - len(valid)} messages of deleted or foreign sessions")
+            if not valid:
+                return 0
 
-            message = ChatMessage(
-                id=str(uuid.uuid4()),
-                session_id=session_id,
-                role=role,
-                content=content,
-            )
-            db.add(message)
-            session.prompts_count += 1
+            inserted = db.execute(
+                pg_insert(ChatMessage)
+                .values([{
+                    "id": row["id"],
+                    "session_id": row["session_id"],
+                    "role": row["role"],
+                    "content": row["content"],
+                    "timestamp": datetime.fromisoformat(row["timestamp"]) if row.get("timestamp") else datetime.utcnow(),
+                } for row in valid])
+                .on_conflict_do_nothing(index_elements=[ChatMessage.id])
+                .returning(ChatMessage.session_id)
+            ).scalars().all()
+            for session_id, count in Counter(inserted).items():
+                db.execute(
+                    update(ChatSession)
+                    .where(ChatSession.id == session_id)
+                    .values(prompts_count=ChatSession.prompts_count + count)
+                )
+            if replace:
+                for row in valid:
+                    db.execute(update(ChatMessage).where(ChatMessage.id == row["id"]).values(content=row["content"]))
             db.commit()
-
-            logger.info(f"Saved message to session {session_id} for user {user_id}")
-            return message
+            return len(inserted)
         except Exception as e:
             db.rollback()
-            logger.error(f"Failed to save message for session {session_id}, user {user_id}: {e}")
+            logger.error(f"Failed to insert {len(rows)} messages: {e}")
             raise
         finally:
             db.close()
@@ -168,27 +156,190 @@ class DatabaseManager:
         db = self.get_session()
         try:
             self.verify_session_ownership(db, session_id, user_id)
-            return db.query(ChatMessage).filter_by(session_id=session_id).all()
+            return db.query(ChatMessage).filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
         except Exception as e:
             logger.error(f"Error fetching messages for session {session_id}, user {user_id}: {e}")
             raise
         finally:
             db.close()
 
-    def delete_session(self, session_id: str, user_id: str):
-        """Delete all messages for a session (verifying ownership)"""
+    def delete_session_messages(self, session_id: str, user_id: str) -> int:
+        """Delete a session's messages and reset its prompt counter (verifying ownership)"""
         db = self.get_session()
         try:
-            self.verify_session_ownership(db, session_id, user_id)
-            session_obj = db.query(ChatSession).filter_by(id=session_id).first()
-            if session_obj:
-                db.delete(session_obj)
-                db.commit()
+            session = self.verify_session_ownership(db, session_id, user_id)
+            deleted = db.query(ChatMessage).filter_by(session_id=session_id).delete()
+            session.prompts_count = 0
+            db.commit()
 
-            logger.info(f"Deleted {session_obj} messages for session {session_id} (user {user_id})")
+            logger.info(f"Deleted {deleted} messages for session {session_id} (user {user_id})")
+            return deleted
         except Exception as e:
             db.rollback()
             logger.error(f"Failed to delete messages for session {session_id}, user {user_id}: {e}")
             raise
         finally:
             db.close()
+
+    # Async variants used by the request path
+
+    async def acreate_user(self, user_data) -> dict:
+        async with self.get_async_session() as db:
+            try:
+                new_user = User(
+                    id=str(uuid.uuid4()),
+                    user_name=user_data.user_name,
+                    password=user_data.password,
+                    name=user_data.name
+                )
+                db.add(new_user)
+                await db.commit()
+
+                return {
+                    "id": new_user.id,
+                    "user_name": new_user.user_name,
+                    "name": new_user.name
+                }
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Failed to create user: {e}")
+                raise
+
+    async def aget_user(self, user_name: str) -> Optional[User]:
+        """Fetch a user by username"""
+        async with self.get_async_session() as db:
+            try:
+                result = await db.execute(select(User).filter_by(user_name=user_name))
+                return result.scalars().first()
+            except Exception as e:
+                logger.error(f"Error fetching user {user_name}: {e}")
+                raise
+
+    async def auser_exists(self, user_name: str) -> bool:
+        return await self.aget_user(user_name) is not None
+
+    async def aget_password_hash(self, user_name: str) -> Optional[str]:
+        """Retrieve the hashed password for a user by username"""
+        user = await self.aget_user(user_name)
+        if not user:
+            logger.warning(f"User {user_name} not found")
+            return None
+        return user.password
+
+    async def acreate_session(self, session_name: str, user_id: str) -> dict:
+        """Create a new chat session for a user (max 10 sessions allowed)"""
+        async with self.get_async_session() as db:
+            try:
+                user = (await db.execute(select(User).filter_by(id=user_id))).scalars().first()
+                if not user:
+                    raise ValueError(f"User with ID {user_id} does not exist.")
+
+                if user.sessions_count >= 10:
+                    raise SessionLimitReachedException("Maximum session limit (10) reached for this user.")
+
+                session = ChatSession(id=str(uuid.uuid4()), name=session_name, user_id=user_id)
+                db.add(session)
+                user.sessions_count += 1
+                await db.commit()
+
+                logger.info(f"Created chat session {session_name} for user {user_id}")
+                return {
+                    "id": session.id,
+                    "name": session.name,
+                    "user_id": session.user_id,
+                    "created_at": session.created_at.isoformat(),
+                    "prompts_count": session.prompts_count
+                }
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Failed to create chat session {session_name}: {e}")
+                raise
+
+    async def averify_session_ownership(self, db: AsyncSession, session_id: str, user_id: str) -> ChatSession:
+        """Helper: fetch session only if it belongs to the given user"""
+        result = await db.execute(select(ChatSession).filter_by(id=session_id, user_id=user_id))
+        session = result.scalars().first()
+        if not session:
+            raise ValueError(f"Session {session_id} does not belong to user {user_id}")
+        return session
+
+    async def aget_chat_session(self, session_id: str, user_id: str) -> ChatSession:
+        """Fetch a chat session by ID, only if owned by the user"""
+        async with self.get_async_session() as db:
+            try:
+                return await self.averify_session_ownership(db, session_id, user_id)
+            except Exception as e:
+                logger.error(f"Error retrieving session {session_id} for user {user_id}: {e}")
+                raise
+
+    async def aget_user_sessions(self, user_id: str) -> List[ChatSession]:
+        """Retrieve all chat sessions for a user"""
+        async with self.get_async_session() as db:
+            try:
+                result = await db.execute(select(ChatSession).filter_by(user_id=user_id))
+                sessions = list(result.scalars().all())
+                if not sessions:
+                    logger.warning(f"No sessions found for user {user_id}")
+                return sessions
+            except Exception as e:
+                logger.error(f"Error fetching sessions for user {user_id}: {e}")
+                raise
+
+    async def aappend_message(self, session_id: str, user_id: str, role: str, content: str, message_id: str) -> bool:
+        """Async append_message: ownership check + counter increment in one UPDATE, then the idempotent insert."""
+        async with self.get_async_session() as db:
+            try:
+                result = await db.execute(
+                    update(ChatSession)
+                    .where(ChatSession.id == session_id, ChatSession.user_id == user_id)
+                    .values(prompts_count=ChatSession.prompts_count + 1)
+                )
+                if result.rowcount == 0:
+                    raise ValueError(f"Session {session_id} does not belong to user {user_id}")
+
+                inserted = (await db.execute(self._insert_message(message_id, session_id, role, content))).first()
+                if inserted is None:
+                    await db.rollback()
+                    return False
+                await db.commit()
+
+                logger.info(f"Saved message to session {session_id} for user {user_id}")
+                return True
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Failed to save message for session {session_id}, user {user_id}: {e}")
+                raise
+
+    async def aget_session_messages(self, session_id: str, user_id: str) -> List[ChatMessage]:
+        """Retrieve all messages for a session, only if owned by the user"""
+        async with self.get_async_session() as db:
+            try:
+                await self.averify_session_ownership(db, session_id, user_id)
+                result = await db.execute(
+                    select(ChatMessage).filter_by(session_id=session_id).order_by(ChatMessage.timestamp)
+                )
+                return list(result.scalars().all())
+            except Exception as e:
+                logger.error(f"Error fetching messages for session {session_id}, user {user_id}: {e}")
+                raise
+
+    async def adelete_session(self, session_id: str, user_id: str):
+        """Delete a session and its messages (verifying ownership)"""
+        async with self.get_async_session() as db:
+            try:
+                # Load the messages up front: the delete cascade cannot lazy-load them under asyncio
+                result = await db.execute(
+                    select(ChatSession).filter_by(id=session_id, user_id=user_id)
+                    .options(selectinload(ChatSession.messages))
+                )
+                session_obj = result.scalars().first()
+                if not session_obj:
+                    raise ValueError(f"Session {session_id} does not belong to user {user_id}")
+                await db.delete(session_obj)
+                await db.commit()
+
+                logger.info(f"Deleted session {session_id} (user {user_id})")
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Failed to delete session {session_id}, user {user_id}: {e}")
+                raise
@@ -0,0 +1,202 @@
+import uuid
+import time
+import queue
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+from app.utils.exceptions import JobQueueFullException, RenderCancelledException
+from app.services.render_workspace import make_settings_key
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+
+@dataclass
+class RenderJob:
+    """A queued /generate request and its outcome."""
+    id: str
+    user_id: str
+    session_id: str
+    prompt: str
+    quality: Optional[str] = None  # final quality (the manager's default unless requested); None keeps the preview
+    script: Optional[str] = None   # already generated (e.g. streamed) script; skips the LLM call
+    status: str = "queued"  # queued | running | completed | failed | cancelled
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    upgrade_status: Optional[str] = None  # queued | running | completed | failed | cancelled
+    upgrade_error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+
+class JobManager:
+    def __init__(self, handler: Callable[..., Dict],
+                 upgrade_handler: Optional[Callable[..., Dict]] = None,
+                 max_workers: int = 2, max_pending_jobs: int = 50, job_ttl: int = 3600,
+                 default_quality: Optional[str] = None, max_upgrade_workers: int = 1):
+        """
+        Runs generation jobs on a bounded worker pool.
+        - handler(session_id, user_id, prompt, cancel_event, script) does the actual LLM + preview
+          render work; `script` is set when the script was already generated.
+        - upgrade_handler(script, output_id, quality, cancel_event) re-renders a finished job at the
+          requested quality, on its own `max_upgrade_workers` threads: a long final-quality encode
+          never holds one of the `max_workers` generation slots.
+        - Both handlers must stop and raise RenderCancelledException once cancel_event is set.
+        - max_workers caps concurrent renders independently of HTTP concurrency.
+        - default_quality is the final quality of jobs that request none, so a cheaper preview
+          (e.g. at a reduced frame rate) is still upgraded to the configured preset.
+        """
+        self.handler = handler
+        self.upgrade_handler = upgrade_handler
+        self.max_pending_jobs = max_pending_jobs
+        self.job_ttl = job_ttl
+        self.default_quality = default_quality
+        self.tasks: "queue.Queue" = queue.Queue()
+        self.upgrades: "queue.Queue" = queue.Queue()
+        self.jobs: Dict[str, RenderJob] = {}
+        self.lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._worker, args=(self.tasks,), name=f"render-job-{i}", daemon=True)
+            for i in range(max_workers)
+        ] + [
+            threading.Thread(target=self._worker, args=(self.upgrades,), name=f"render-upgrade-{i}", daemon=True)
+            for i in range(max_upgrade_workers if upgrade_handler else 0)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, session_id: str, user_id: str, prompt: str, quality: Optional[str] = None,
+               script: Optional[str] = None) -> RenderJob:
+        """Enqueue a job and return immediately."""
+        with self.lock:
+            self._prune_finished()
+            pending = sum(1 for job in self.jobs.values() if job.status in ("queued", "running"))
+            if pending >= self.max_pending_jobs:
+                raise JobQueueFullException("Render queue is full, please retry shortly.")
+
+            job = RenderJob(id=str(uuid.uuid4()), user_id=user_id, session_id=session_id,
+                            prompt=prompt, quality=quality or self.default_quality, script=script)
+            self.jobs[job.id] = job
+
+        self.tasks.put((self._run, job))
+        logger.info(f"Queued job {job.id} for session '{session_id}' (user: {user_id})")
+        return job
+
+    def get_job(self, job_id: str, user_id: str) -> Optional[RenderJob]:
+        """Fetch a job only if it belongs to the given user."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if not job or job.user_id != user_id:
+            return None
+        return job
+
+    def cancel(self, job_id: str, user_id: str) -> Optional[RenderJob]:
+        """
+        Cancel a job of the given user. Queued work is dropped; running renders are killed.
+        Returns None if the job does not exist or belongs to someone else.
+        """
+        job = self.get_job(job_id, user_id)
+        if not job:
+            return None
+
+        job.cancel_event.set()
+        with self.lock:
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+            if job.upgrade_status == "queued":
+                job.upgrade_status = "cancelled"
+        logger.info(f"Cancellation requested for job {job.id}")
+        return job
+
+    @staticmethod
+    def _worker(tasks: "queue.Queue") -> None:
+        while True:
+            task, job = tasks.get()
+            try:
+                task(job)
+            finally:
+                tasks.task_done()
+
+    def _run(self, job: RenderJob) -> None:
+        with self.lock:
+            if job.status == "cancelled":
+                return
+            job.status = "running"
+        job.started_at = time.time()
+        try:
+            result = self.handler(job.session_id, job.user_id, job.prompt, job.cancel_event, job.script)
+            job.result = result
+            if result.get("success"):
+                job.status = "completed"
+                self._schedule_upgrade(job)
+            else:
+                job.status = "failed"
+                job.error = result.get("final_error")
+        except RenderCancelledException:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            logger.info(f"Job {job.id} finished with status '{job.status}'")
+
+    def _schedule_upgrade(self, job: RenderJob) -> None:
+        """
+        Queue the expensive final-quality render for the upgrade workers.
+        Skipped only when the preview already used the final settings: a preview at the same
+        quality letter but a reduced frame rate still needs the upgrade.
+        """
+        if not self.upgrade_handler or not job.quality:
+            return
+        if job.result.get("settings_key") == make_settings_key(job.quality):
+            return
+        job.result["preview_filename"] = job.result["filename"]
+        job.upgrade_status = "queued"
+        self.upgrades.put((self._run_upgrade, job))
+
+    def _run_upgrade(self, job: RenderJob) -> None:
+        with self.lock:
+            if job.upgrade_status == "cancelled":
+                return
+            job.upgrade_status = "running"
+        try:
+            upgrade = self.upgrade_handler(job.result["script_cleaned"], job.result["filename"], job.quality,
+                                           job.cancel_event)
+            if upgrade.get("success"):
+                # Swap the published video; the preview file stays for clients still showing it
+                job.result["filename"] = upgrade["filename"]
+                job.result["quality"] = upgrade["quality"]
+                job.result["settings_key"] = upgrade["settings_key"]
+                job.upgrade_status = "completed"
+            else:
+                job.upgrade_status = "failed"
+                job.upgrade_error = upgrade.get("final_error")
+        except RenderCancelledException:
+            job.upgrade_status = "cancelled"
+        except Exception as e:
+            logger.error(f"Quality upgrade for job {job.id} failed: {e}")
+            job.upgrade_status = "failed"
+            job.upgrade_error = str(e)
+        finally:
+            job.finished_at = time.time()
+            logger.info(f"Quality upgrade for job {job.id} finished with status '{job.upgrade_status}'")
+
+    def _prune_finished(self) -> None:
+        """Drop finished jobs older than job_ttl. Caller holds the lock."""
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff
+                   and job.upgrade_status not in ("queued", "running")]
+        for job_id in expired:
+            del self.jobs[job_id]
@@ -0,0 +1,288 @@
+import os
+import time
+import queue
+import signal
+import logging
+import resource
+import threading
+import multiprocessing
+import importlib.util
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.services.render_errors import RenderError, OutputTail
+from app.utils.process_limits import apply_rlimits, kill_process_group
+
+# NOTE: this module is imported by freshly spawned worker processes, so it must not
+# import anything from `app` that builds the application context.
+
+# Poll interval while waiting on a worker, bounds how quickly timeouts and cancels react
+WAIT_INTERVAL = 0.25
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        # ru_maxrss is the peak in KB on Linux; good enough as a growth signal
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _RenderLogWatcher(logging.Handler):
+    """
+    Watches manim's log during a render:
+    - counts per-animation lines to tell reused partial movies from fresh ones
+    - keeps a bounded tail of warnings/errors (e.g. LaTeX compile errors) for error reports
+    """
+
+    def __init__(self):
+        super().__init__(level=logging.INFO)
+        self.stats = {"partials_reused": 0, "partials_rendered": 0}
+        self.tail = OutputTail(max_lines=50)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno >= logging.WARNING:
+            try:
+                self.tail.append(record.getMessage())
+            except Exception:
+                pass
+        if not isinstance(record.msg, str):
+            return
+        if "Using cached data" in record.msg:
+            self.stats["partials_reused"] += 1
+        elif "Partial movie file written" in record.msg:
+            self.stats["partials_rendered"] += 1
+
+
+def _render_job(job: Dict) -> Dict:
+    """Import the script as a module and render its scenes with the already loaded manim."""
+    from manim import Scene, tempconfig, logger as manim_logger
+    from manim.constants import QUALITIES
+    from manim.renderer.cairo_renderer import CairoRenderer
+
+    script_path = job["script_path"]
+    quality = next(q for q in QUALITIES.values() if q["flag"] == job["quality"])
+    apply_rlimits(cpu_seconds=job.get("cpu_seconds"))
+
+    watcher = _RenderLogWatcher()
+    manim_logger.addHandler(watcher)
+    try:
+        module_name = Path(script_path).stem
+        spec = importlib.util.spec_from_file_location(module_name, script_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        scene_classes = [
+            obj for obj in vars(module).values()
+            if isinstance(obj, type) and issubclass(obj, Scene) and obj.__module__ == module_name
+        ]
+        if job.get("scene_names"):
+            scene_classes = [cls for cls in scene_classes if cls.__name__ in job["scene_names"]]
+        if not scene_classes:
+            return {"success": False, "error": f"No Scene subclass found in {script_path}", "stats": watcher.stats}
+
+        overrides = {
+            "input_file": script_path,
+            "media_dir": job.get("media_dir", "media"),
+            "pixel_height": quality["pixel_height"],
+            "pixel_width": quality["pixel_width"],
+            "frame_rate": quality["frame_rate"],
+        }
+        if job.get("frame_rate"):
+            overrides["frame_rate"] = job["frame_rate"]
+        if job.get("tex_dir"):
+            overrides["tex_dir"] = job["tex_dir"]
+        if job.get("dry_run"):
+            # No files written; play() jumps straight to each animation's end state
+            overrides["dry_run"] = True
+        with tempconfig(overrides):
+            for scene_cls in scene_classes:
+                if job.get("dry_run"):
+                    scene_cls(renderer=CairoRenderer(skip_animations=True)).render()
+                else:
+                    scene_cls().render()
+
+        return {"success": True, "error": None, "stats": watcher.stats}
+    except MemoryError:
+        error = RenderError.limit("memory_limit", "Render ran out of its address-space limit (MemoryError)")
+        return {"success": False, "error": str(error), "stats": watcher.stats}
+    except BaseException as e:
+        error = RenderError.from_exception(e, script_path, watcher.tail)
+        return {"success": False, "error": str(error), "stats": watcher.stats}
+    finally:
+        manim_logger.removeHandler(watcher)
+
+
+def _worker_main(conn, max_jobs: int, max_rss_mb: int, memory_mb: Optional[int]) -> None:
+    """Worker loop: import manim once, then render jobs until recycled."""
+    # Own process group, so a timeout can kill the worker together with any latex/ffmpeg children
+    os.setsid()
+    apply_rlimits(memory_mb=memory_mb)
+    import manim  # noqa: F401  (the whole point: pay the import once per worker)
+
+    jobs_done = 0
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        result = _render_job(job)
+        jobs_done += 1
+        result["recycle"] = jobs_done >= max_jobs or _rss_mb() > max_rss_mb
+        conn.send(result)
+        if result["recycle"]:
+            break
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx, max_jobs: int, max_rss_mb: int, memory_mb: Optional[int]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, max_jobs, max_rss_mb, memory_mb), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+    def kill(self) -> None:
+        kill_process_group(self.process.pid)
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class ManimWorkerPool:
+    def __init__(self, size: int = 2, max_jobs_per_worker: int = 50, max_rss_mb: int = 1500,
+                 timeout: Optional[int] = None, cpu_seconds: Optional[int] = None, memory_mb: Optional[int] = None):
+        """
+        Pool of long-lived processes that import manim once and render many scripts.
+        - A worker is replaced after `max_jobs_per_worker` renders or once its RSS exceeds `max_rss_mb`.
+        - Workers are spawned (not forked) so they never inherit the server's threads or sockets.
+        - Each render gets `timeout` wall-clock seconds and `cpu_seconds` of CPU; each worker is
+          capped at `memory_mb` of address space. Offending workers are killed with their children.
+        """
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_rss_mb = max_rss_mb
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.ctx = multiprocessing.get_context("spawn")
+        self.idle: "queue.Queue[_Worker]" = queue.Queue()
+        self.started = False
+        self.lock = threading.Lock()
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self.ctx, self.max_jobs_per_worker, self.max_rss_mb, self.memory_mb)
+
+    def start(self) -> None:
+        """Spawn the workers so they import manim before the first job arrives."""
+        with self.lock:
+            if self.started:
+                return
+            for _ in range(self.size):
+                self.idle.put(self._spawn())
+            self.started = True
+            logger.info(f"Manim worker pool started ({self.size} workers)")
+
+    def render(self, script_path: str, quality: str, scene_names: Optional[List[str]] = None,
+               media_dir: str = "media", dry_run: bool = False,
+               tex_dir: Optional[str] = None, frame_rate: Optional[int] = None,
+               cancel_event: Optional[threading.Event] = None) -> Tuple[bool, Optional[str], Dict[str, int]]:
+        """
+        Render a script on a warm worker. Output lands where `manim -q{quality}` would put it.
+        Setting `cancel_event` kills the render in flight; a job cancelled before it reaches a
+        worker never takes one, so the warm worker is kept.
+
+        Returns:
+            Tuple[bool, Optional[str], Dict[str, int]]: (success, error_message, partial-movie stats)
+        """
+        self.start()
+        cancelled = RenderError("cancelled", f"Render of {script_path} was cancelled")
+        worker = None
+        while worker is None:
+            if cancel_event is not None and cancel_event.is_set():
+                return False, str(cancelled), {}
+            try:
+                worker = self.idle.get(timeout=WAIT_INTERVAL)
+            except queue.Empty:
+                continue
+        if cancel_event is not None and cancel_event.is_set():
+            self.idle.put(worker)
+            return False, str(cancelled), {}
+        if not worker.process.is_alive():
+            worker = self._spawn()
+
+        job = {
+            "script_path": os.path.abspath(script_path),
+            "quality": quality,
+            "scene_names": scene_names,
+            "media_dir": media_dir,
+            "dry_run": dry_run,
+            "tex_dir": tex_dir,
+            "frame_rate": frame_rate,
+            "cpu_seconds": self.cpu_seconds,
+        }
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        try:
+            worker.conn.send(job)
+            while not worker.conn.poll(WAIT_INTERVAL):
+                failure = None
+                if cancel_event is not None and cancel_event.is_set():
+                    failure = cancelled
+                elif deadline is not None and time.monotonic() > deadline:
+                    failure = RenderError.limit("timeout", f"Rendering exceeded the {self.timeout}s wall-clock limit")
+                if failure:
+                    # Mid-render: the only way to stop manim is to kill the worker
+                    worker.kill()
+                    self.idle.put(self._spawn())
+                    return False, str(failure), {}
+            result = worker.conn.recv()
+        except (EOFError, BrokenPipeError, OSError):
+            worker.process.join(timeout=5)
+            exitcode = worker.process.exitcode
+            worker.kill()
+            self.idle.put(self._spawn())
+            return False, str(self._crash_error(script_path, exitcode)), {}
+
+        if result["recycle"]:
+            worker.stop()
+            worker = self._spawn()
+        self.idle.put(worker)
+        return result["success"], result["error"], result["stats"]
+
+    @staticmethod
+    def _crash_error(script_path: str, exitcode: Optional[int]) -> RenderError:
+        if exitcode == -signal.SIGXCPU:
+            return RenderError.limit("cpu_limit", "Render exceeded its CPU-time limit")
+        if exitcode == -signal.SIGKILL:
+            return RenderError.limit("memory_limit", "Render worker was killed (likely out of memory)")
+        return RenderError("crashed", f"Render worker died while rendering {script_path} (exit code {exitcode})")
+
+    def shutdown(self) -> None:
+        with self.lock:
+            while not self.idle.empty():
+                self.idle.get_nowait().stop()
+            self.started = False
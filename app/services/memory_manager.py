@@ -1,79 +1,183 @@
-from typing import List, Union
+import uuid
+import logging
+from typing import Iterator, List, Tuple, Union
 from langchain.schema import AIMessage, HumanMessage
 from app.services.db_manager import DatabaseManager
 from app.services.redis_manager import RedisManager
+from app.utils.singleflight import SingleFlight, AsyncSingleFlight
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
 
 class MemoryManager:
     def __init__(self, database_manager: DatabaseManager, redis_manager: RedisManager):
         """Initializes the memory manager with both database and Redis interfaces."""
         self.database_manager = database_manager
         self.redis_manager = redis_manager
+        # Concurrent cold loads of one session share a single Postgres read + Redis backfill
+        self.backfills = SingleFlight()
+        self.abackfills = AsyncSingleFlight()
 
     def load_history(self, session_id: str, user_id: str) -> List[Union[AIMessage, HumanMessage]]:
         """
         Loads chat history for a session.
         - Tries Redis first (fast).
-        - Falls back to DB if not found, and then backfills Redis.
+        - Falls back to DB if not found, and then backfills Redis in one round-trip.
+        - Concurrent misses for the same session are coalesced into one backfill.
         """
         history = self.redis_manager.get_session_history(session_id=session_id, user_id=user_id)
         if history:
             return history
 
+        return list(self.backfills.do((session_id, user_id), lambda: self._backfill(session_id, user_id)))
+
+    def _backfill(self, session_id: str, user_id: str) -> List[Union[AIMessage, HumanMessage]]:
         messages = self.database_manager.get_session_messages(session_id=session_id, user_id=user_id)
-        history = []
+        history = [self._to_message(message, seq) for seq, message in enumerate(messages, start=1)]
+        self.redis_manager.backfill_history(session_id=session_id, user_id=user_id, messages=history)
+        return history
 
-        for message in messages:
-            temp = HumanMessage(content=message.content) if message.role == "human" else AIMessage(content=message.content)
-            history.append(temp)
-            self.redis_manager.save_message(session_id=session_id, user_id=user_id, message=temp)
+    @staticmethod
+    def _to_message(message, seq: int) -> Union[AIMessage, HumanMessage]:
+        """A stored message, numbered like backfill_history numbers it in Redis."""
+        message_class = HumanMessage if message.role == "human" else AIMessage
+        return message_class(content=message.content, id=message.id, response_metadata={"seq": seq})
 
-        return history
+    @staticmethod
+    def _new_message(role: str, content: str) -> Union[AIMessage, HumanMessage]:
+        """A message with the id it keeps in Redis and Postgres, whichever writer persists it."""
+        message_class = HumanMessage if role == "human" else AIMessage
+        return message_class(content=content, id=str(uuid.uuid4()))
 
     def save_message(self, session_id: str, user_id: str, role: str, content: str) -> None:
         """
         Saves a single chat message to both Redis and the database.
+        The prompt limit is enforced atomically by Redis; the database write only appends.
+        Under write-behind, Redis also queues the message and MessagePersister inserts it later.
         """
-        message = HumanMessage(content=content) if role == "human" else AIMessage(content=content)
+        message = self._new_message(role, content)
         self.redis_manager.save_message(session_id=session_id, user_id=user_id, message=message)
-        self.database_manager.save_message(session_id=session_id, user_id=user_id, role=role, content=content)
+        if not self.redis_manager.write_behind:
+            self.database_manager.append_message(session_id=session_id, user_id=user_id, role=role, content=content,
+                                                 message_id=message.id)
 
-    def sync_redis_to_postgres(self) -> None:
+    def replace_last_ai_message(self, session_id: str, user_id: str, content: str) -> bool:
         """
-        Syncs all chat sessions from Redis to PostgreSQL.
-        - Redis is assumed to be the latest source of truth.
+        Rewrites the last AI message of a session in Redis and PostgreSQL, without counting a prompt.
+        The row is upserted by message id, so it is correct whether or not a writer (request path,
+        write-behind, sync) has persisted the original yet; a later insert of the original is skipped.
+        Returns whether there was a message to replace.
         """
-        session_keys = self.redis_manager.get_all_session_keys()
+        entry = self.redis_manager.replace_last_ai_message(session_id=session_id, user_id=user_id, content=content)
+        if entry is None or "id" not in entry:
+            return False
+        self.database_manager.insert_messages([{
+            "session_id": session_id,
+            "user_id": user_id,
+            "id": entry["id"],
+            "role": "ai",
+            "content": content,
+            "timestamp": entry.get("timestamp"),
+        }], replace=True)
+        return True
 
-        for key in session_keys:
+    def sync_redis_to_postgres(self, full: bool = False, batch_size: int = 200) -> int:
+        """
+        Copies messages that are in Redis but not yet in PostgreSQL.
+        - Only sessions marked dirty by an append are visited; `full` walks every history key
+          with SCAN instead (e.g. for histories written before dirty tracking).
+        - Only entries after the seq a session is synced through are sent, for a whole batch of
+          sessions in one multi-row INSERT; entries keep their message id, so persisted ones are skipped.
+        - The synced-through seq is moved only after the INSERT commits. Postgres row counts are not
+          a safe high-water mark: a failed request-path append leaves a gap in the sequence.
+        Returns the number of messages inserted.
+        """
+        batches = self._all_sessions(batch_size) if full else self.redis_manager.iter_dirty_sessions(batch_size)
+        inserted = 0
+        for sessions in batches:
             try:
-                # Key format: user:{user_id}:session:{session_id}:history
-                parts = key.split(":")
-                user_id = parts[1]
-                session_id = parts[3]
-
-                messages = self.redis_manager.get_session_history(session_id=session_id, user_id=user_id)
-                if not messages:
-                    continue
-
-                session_exists = self.database_manager.get_chat_session(session_id=session_id, user_id=user_id)
-                if not session_exists:
-                    self.database_manager.create_session(session_id=session_id, user_id=user_id)
-                else:
-                    self.database_manager.delete_session_messages(session_id=session_id, user_id=user_id)
-
-                for msg in messages:
-                    role = "human" if isinstance(msg, HumanMessage) else "ai"
-                    self.database_manager.save_message(session_id=session_id, user_id=user_id, role=role, content=msg.content)
-
-                print(f"[✓] Synced session {session_id} for user {user_id} from Redis to DB.")
+                inserted += self._sync_batch(sessions)
             except Exception as e:
-                print(f"[✗] Error syncing session {session_id} for user {user_id}: {e}")
+                logger.error(f"Error syncing {len(sessions)} sessions from Redis to DB: {e}")
+        return inserted
+
+    def _all_sessions(self, batch_size: int) -> Iterator[List[Tuple[str, str]]]:
+        batch = []
+        for key in self.redis_manager.get_all_session_keys():
+            # Key format: user:{user_id}:session:{session_id}:history
+            parts = key.split(":")
+            batch.append((parts[1], parts[3]))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _sync_batch(self, sessions: List[Tuple[str, str]]) -> int:
+        states = self.redis_manager.get_sync_state(sessions)
 
-        print("✅ Redis to DB sync completed.")
+        rows = []
+        synced = []
+        for (user_id, session_id), (count, synced_seq, entries) in zip(sessions, states):
+            # Rows of deleted or foreign sessions are dropped by insert_messages
+            rows.extend({
+                "session_id": session_id,
+                "user_id": user_id,
+                "id": entry["id"],
+                "role": entry["type"],
+                "content": entry["content"],
+                "timestamp": entry.get("timestamp"),
+            } for entry in entries if "id" in entry)
+            synced.append((session_id, user_id, max([synced_seq] + [entry.get("seq", 0) for entry in entries])))
+
+        inserted = self.database_manager.insert_messages(rows) if rows else 0
+        for session_id, user_id, seq in synced:
+            self.redis_manager.mark_synced(session_id=session_id, user_id=user_id, seq=seq)
+        if inserted:
+            logger.info(f"Synced {inserted} messages of {len(sessions)} sessions from Redis to DB")
+        return inserted
 
     def clear_session(self, session_id: str, user_id: str) -> None:
         """
-        Clears session data from both Redis and PostgreSQL.
+        Clears a session's messages from both Redis and PostgreSQL, keeping the session itself.
         """
         self.redis_manager.clear_session(session_id=session_id, user_id=user_id)
         self.database_manager.delete_session_messages(session_id=session_id, user_id=user_id)
+
+    # Async variants used by the request path
+
+    async def acreate_session(self, session_name: str, user_id: str) -> dict:
+        session = await self.database_manager.acreate_session(session_name, user_id)
+        await self.redis_manager.acache_session(session)
+        return session
+
+    async def adelete_session(self, session_id: str, user_id: str) -> None:
+        await self.database_manager.adelete_session(session_id=session_id, user_id=user_id)
+        await self.redis_manager.aforget_session(session_id=session_id, user_id=user_id)
+
+    async def aload_history(self, session_id: str, user_id: str) -> List[Union[AIMessage, HumanMessage]]:
+        """Async load_history: Redis first, then DB with a coalesced Redis backfill."""
+        history = await self.redis_manager.aget_session_history(session_id=session_id, user_id=user_id)
+        if history:
+            return history
+
+        return list(await self.abackfills.do((session_id, user_id), lambda: self._abackfill(session_id, user_id)))
+
+    async def _abackfill(self, session_id: str, user_id: str) -> List[Union[AIMessage, HumanMessage]]:
+        messages = await self.database_manager.aget_session_messages(session_id=session_id, user_id=user_id)
+        history = [self._to_message(message, seq) for seq, message in enumerate(messages, start=1)]
+        await self.redis_manager.abackfill_history(session_id=session_id, user_id=user_id, messages=history)
+        return history
+
+    async def asave_message(self, session_id: str, user_id: str, role: str, content: str) -> None:
+        """Async save_message: Redis (limit enforced atomically), then the database append."""
+        message = self._new_message(role, content)
+        await self.redis_manager.asave_message(session_id=session_id, user_id=user_id, message=message)
+        if not self.redis_manager.write_behind:
+            await self.database_manager.aappend_message(session_id=session_id, user_id=user_id, role=role, content=content,
+                                                        message_id=message.id)
@@ -0,0 +1,157 @@
+import socket
+import logging
+import threading
+from time import sleep, monotonic
+from typing import Dict, List, Optional, Tuple
+import redis
+from sqlalchemy.exc import OperationalError
+from app.services.db_manager import DatabaseManager
+from app.services.redis_manager import RedisManager
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+Entry = Tuple[bytes, Optional[Dict[bytes, bytes]]]
+
+
+class MessagePersister:
+    def __init__(self, redis_manager: RedisManager, db_manager: DatabaseManager, stream: str,
+                 group: str = "chat-persister", consumer: Optional[str] = None, batch_size: int = 200,
+                 block_ms: int = 1000, claim_idle_ms: int = 60000):
+        """
+        Write-behind consumer: drains chat messages from a Redis Stream into Postgres in batches.
+        - Entries are read through a consumer group and acknowledged (then deleted) only once committed.
+        - On start, this consumer's own unacknowledged entries are replayed; entries left pending by
+          any consumer for `claim_idle_ms` (failed batches, dead servers) are claimed and retried.
+        - Inserts are idempotent (each entry carries the message's id), so a replay never
+          duplicates a message.
+        - Entries Postgres rejects on their own (not a connection problem) go to "{stream}:dead".
+        """
+        self.client = redis_manager.client
+        self.db_manager = db_manager
+        self.stream = stream
+        self.dead_stream = f"{stream}:dead"
+        self.group = group
+        self.consumer = consumer or socket.gethostname()
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            logger.warning("Message persister already running.")
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+        logger.info(f"Message persister started (stream: {self.stream}, consumer: {self.consumer})")
+
+    def stop(self):
+        """Stops after the current batch; anything unacknowledged is replayed on the next start."""
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        logger.info("Message persister stopped.")
+
+    def _ensure_group(self):
+        try:
+            self.client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _worker(self):
+        replayed = False
+        last_claim = 0.0
+        while self.running:
+            try:
+                if not replayed:
+                    self._ensure_group()
+                    self._replay_own_pending()
+                    replayed = True
+
+                if monotonic() - last_claim >= self.claim_idle_ms / 2000:
+                    self._claim_stale()
+                    last_claim = monotonic()
+
+                response = self.client.xreadgroup(self.group, self.consumer, {self.stream: ">"},
+                                                  count=self.batch_size, block=self.block_ms)
+                for _, entries in response or []:
+                    self._persist(entries)
+            except Exception as e:
+                logger.error(f"Message persister error: {e}")
+                sleep(1)
+
+    def _replay_own_pending(self):
+        """Entries delivered to this consumer before a restart but never acknowledged."""
+        last_id = "0"
+        while self.running:
+            response = self.client.xreadgroup(self.group, self.consumer, {self.stream: last_id}, count=self.batch_size)
+            entries = response[0][1] if response else []
+            if not entries:
+                return
+            self._persist(entries)
+            last_id = entries[-1][0]
+
+    def _claim_stale(self):
+        start_id = "0-0"
+        while self.running:
+            next_id, entries, *_ = self.client.xautoclaim(self.stream, self.group, self.consumer,
+                                                          min_idle_time=self.claim_idle_ms,
+                                                          start_id=start_id, count=self.batch_size)
+            if entries:
+                logger.info(f"Retrying {len(entries)} unacknowledged messages")
+                self._persist(entries)
+            if not entries or next_id in (b"0-0", "0-0"):
+                return
+            start_id = next_id
+
+    @staticmethod
+    def _decode(fields: Dict[bytes, bytes]) -> Dict[str, str]:
+        return {key.decode("utf-8"): value.decode("utf-8") for key, value in fields.items()}
+
+    def _ack(self, ids: List[bytes]):
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.xack(self.stream, self.group, *ids)
+            pipe.xdel(self.stream, *ids)
+            pipe.execute()
+
+    def _persist(self, entries: List[Entry]):
+        # Entries trimmed from the stream while pending come back without fields
+        ids = [entry_id for entry_id, _ in entries]
+        rows = [self._decode(fields) for _, fields in entries if fields]
+        if not rows:
+            self._ack(ids)
+            return
+        try:
+            inserted = self.db_manager.insert_messages(rows)
+            self._ack(ids)
+            logger.info(f"Persisted {inserted} of {len(rows)} messages")
+        except OperationalError as e:
+            # Postgres unreachable: leave the batch pending, it is retried once idle
+            logger.error(f"Postgres unavailable, {len(rows)} messages left pending: {e}")
+            sleep(1)
+        except Exception as e:
+            logger.error(f"Batch insert failed, retrying messages one by one: {e}")
+            self._persist_each(entries)
+
+    def _persist_each(self, entries: List[Entry]):
+        for entry_id, fields in entries:
+            if not fields:
+                self._ack([entry_id])
+                continue
+            try:
+                self.db_manager.insert_messages([self._decode(fields)])
+            except OperationalError:
+                continue
+            except Exception as e:
+                logger.error(f"Moving message {entry_id} to {self.dead_stream}: {e}")
+                self.client.xadd(self.dead_stream, fields)
+            self._ack([entry_id])
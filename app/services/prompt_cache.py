@@ -0,0 +1,85 @@
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+
+class PromptCache:
+    def __init__(self, system_prompt: str, enabled: bool = False, ttl: int = 24 * 3600, max_entries: int = 1000):
+        """
+        Maps a normalized prompt to a previously successful script + video.
+        - Entries are scoped to the system prompt version, so prompt edits invalidate them.
+        - Expire after `ttl` seconds; least recently used entries are evicted past `max_entries`.
+        """
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:12]
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation."""
+        normalized = re.sub(r"\s+", " ", prompt.strip().lower())
+        return normalized.rstrip(".!?")
+
+    def make_key(self, prompt: str) -> str:
+        normalized = self.normalize_prompt(prompt)
+        return hashlib.sha256(f"{self.version}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, prompt: str) -> Optional[Dict]:
+        """Return {"script_cleaned", "filename"} for a warm prompt, or None. Logs the running hit/miss counts."""
+        if not self.enabled:
+            return None
+
+        key = self.make_key(prompt)
+        with self.lock:
+            entry = self.entries.get(key)
+            hit = entry is not None and entry["expires_at"] >= time.time()
+            if hit:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.entries.pop(key, None)
+                self.misses += 1
+        logger.info(f"Prompt cache {'hit' if hit else 'miss'}: {key[:12]} ({self.stats()})")
+        if not hit:
+            return None
+        return {"script_cleaned": entry["script_cleaned"], "filename": entry["filename"]}
+
+    def put(self, prompt: str, script_cleaned: str, filename: str) -> None:
+        if not self.enabled:
+            return
+
+        key = self.make_key(prompt)
+        with self.lock:
+            self.entries[key] = {
+                "script_cleaned": script_cleaned,
+                "filename": filename,
+                "expires_at": time.time() + self.ttl
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, prompt: str) -> None:
+        with self.lock:
+            self.entries.pop(self.make_key(prompt), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
@@ -1,68 +1,383 @@
 import json
+import uuid
 import redis
-from typing import List, Union
+from datetime import datetime
+import redis.asyncio as aioredis
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from langchain.schema import AIMessage, HumanMessage
 from app.services.db_manager import DatabaseManager  # import your DB manager
+from app.services.session_cache import SessionCache
+from app.utils.tokens import count_tokens
+from app.utils.exceptions import PromptLimitReachedException
+
+PROMPT_LIMIT = 20    # messages a session may store
+HISTORY_LENGTH = 20  # messages kept in the Redis history
+HISTORY_TTL = 24 * 3600  # seconds an idle history stays cached; Postgres backfills it afterwards
+DIRTY_SESSIONS_KEY = "sync:dirty_sessions"  # "{user_id}:{session_id}" of sessions appended since their last sync
+
+# Check the prompt counter, append and trim in one atomic round-trip. The new count is the
+# message's sequence number in its session, stored with it; the session is marked dirty for sync.
+# A seeded counter never goes below the last sequence number still in the history, since the
+# persisted count can lag behind it (failed appends, write-behind entries not yet drained).
+# KEYS: history, counter, dirty set[, write-behind stream]. ARGV: message, limit, history length,
+# counter seed (-1 = unknown), history TTL, dirty member[, stream entry field/value pairs...].
+# Returns the new count, -1 if the limit is reached, -2 if the counter must be seeded first.
+APPEND_MESSAGE_LUA = """
+local count = redis.call('GET', KEYS[2])
+if not count then
+    if tonumber(ARGV[4]) < 0 then
+        return -2
+    end
+    count = tonumber(ARGV[4])
+    local last = redis.call('LINDEX', KEYS[1], -1)
+    if last then
+        local last_seq = cjson.decode(last)['seq']
+        if last_seq and last_seq > count then
+            count = last_seq
+        end
+    end
+    redis.call('SET', KEYS[2], count)
+end
+if tonumber(count) >= tonumber(ARGV[2]) then
+    return -1
+end
+local seq = redis.call('INCR', KEYS[2])
+local message = cjson.decode(ARGV[1])
+message['seq'] = seq
+redis.call('RPUSH', KEYS[1], cjson.encode(message))
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[3]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('SADD', KEYS[3], ARGV[6])
+if KEYS[4] then
+    redis.call('XADD', KEYS[4], '*', unpack(ARGV, 7))
+end
+return seq
+"""
+
+# Write a whole history loaded from Postgres in one round-trip, unless another
+# process already did. KEYS: history. ARGV: history length, TTL, messages...
+BACKFILL_HISTORY_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('RPUSH', KEYS[1], unpack(ARGV, 3))
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[1]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return #ARGV - 2
+"""
+
+# Read what the sync still has to persist, atomically per session: the counter, the seq the
+# session is synced through and the history entries after it. Entries are in seq order, so they
+# are the last `count - synced` ones (an entry without a seq predates sequence numbers).
+# KEYS: counter, synced mark, history, for each session. Returns {count or nil, synced, {entries}} each.
+SYNC_STATE_LUA = """
+local states = {}
+for i = 1, #KEYS, 3 do
+    local count = redis.call('GET', KEYS[i])
+    local synced = tonumber(redis.call('GET', KEYS[i + 1]) or 0)
+    local entries = {}
+    if not count then
+        entries = redis.call('LRANGE', KEYS[i + 2], 0, -1)
+    elseif tonumber(count) > synced then
+        entries = redis.call('LRANGE', KEYS[i + 2], synced - tonumber(count), -1)
+    end
+    states[#states + 1] = {count or false, synced, entries}
+end
+return states
+"""
+
+# Record that a session is persisted through `seq` (never moving the mark back), then clear its
+# dirty mark unless a message was appended after it.
+# KEYS: dirty set, counter, synced mark. ARGV: dirty member, seq persisted through, mark TTL.
+MARK_SYNCED_LUA = """
+local synced = math.max(tonumber(ARGV[2]), tonumber(redis.call('GET', KEYS[3]) or 0))
+if synced > 0 then
+    redis.call('SET', KEYS[3], synced, 'EX', ARGV[3])
+end
+local count = redis.call('GET', KEYS[2])
+if count and tonumber(count) > synced then
+    return 0
+end
+return redis.call('SREM', KEYS[1], ARGV[1])
+"""
+
+# Rewrite the content of the session's last AI message in place, keeping its id, seq and append
+# time; the prompt counter is not touched. KEYS: history. ARGV: content, token count.
+# Returns the updated entry, or nil if the history holds no AI message.
+REPLACE_LAST_AI_LUA = """
+local entries = redis.call('LRANGE', KEYS[1], 0, -1)
+for i = #entries, 1, -1 do
+    local message = cjson.decode(entries[i])
+    if message['type'] == 'ai' then
+        message['content'] = ARGV[1]
+        message['tokens'] = tonumber(ARGV[2])
+        local encoded = cjson.encode(message)
+        redis.call('LSET', KEYS[1], i - 1, encoded)
+        return encoded
+    end
+end
+return false
+"""
 
 class RedisManager:
-    def __init__(self, db_manager: DatabaseManager, host: str = "localhost", port: int = 6379, db: int = 0):
-        """Initializes Redis and Database managers."""
+    def __init__(self, db_manager: DatabaseManager, host: str = "localhost", port: int = 6379, db: int = 0,
+                 max_connections: int = 100, session_cache_ttl: int = 60, session_cache_max_entries: int = 10000,
+                 write_stream: Optional[str] = None):
+        """
+        Initializes Redis and Database managers.
+        - `write_stream`: enables write-behind; saved messages are also added to this Redis Stream,
+          in the same atomic call, for MessagePersister to insert into Postgres.
+        """
         self.client = redis.Redis(host=host, port=port, db=db)
+        # asyncio client for the request path, sharing one bounded connection pool
+        self.aclient = aioredis.Redis(connection_pool=aioredis.ConnectionPool(
+            host=host, port=port, db=db, max_connections=max_connections
+        ))
         self.db_manager = db_manager
+        self.write_stream = write_stream
+        self.append_script = self.client.register_script(APPEND_MESSAGE_LUA)
+        self.aappend_script = self.aclient.register_script(APPEND_MESSAGE_LUA)
+        self.backfill_script = self.client.register_script(BACKFILL_HISTORY_LUA)
+        self.abackfill_script = self.aclient.register_script(BACKFILL_HISTORY_LUA)
+        self.sync_state_script = self.client.register_script(SYNC_STATE_LUA)
+        self.mark_synced_script = self.client.register_script(MARK_SYNCED_LUA)
+        self.replace_last_ai_script = self.client.register_script(REPLACE_LAST_AI_LUA)
+        # Session ownership checks on the history path, without a Postgres round-trip
+        self.session_cache = SessionCache(self.client, self.aclient, db_manager,
+                                          l1_ttl=session_cache_ttl, l1_max_entries=session_cache_max_entries)
 
     def get_session_key(self, session_id: str, user_id: str) -> str:
         """Generates a Redis key based on user and session for isolation and ownership."""
         return f"user:{user_id}:session:{session_id}:history"
 
-    def serialize_message(self, message: Union[AIMessage, HumanMessage]) -> str:
-        """Converts a HumanMessage or AIMessage to JSON."""
-        return json.dumps({
+    def get_counter_key(self, session_id: str, user_id: str) -> str:
+        """Key of the session's prompt counter, the authority for the prompt limit."""
+        return f"user:{user_id}:session:{session_id}:prompts"
+
+    def get_summary_key(self, session_id: str, user_id: str) -> str:
+        """Key of the rolling summary of a session's older messages."""
+        return f"user:{user_id}:session:{session_id}:summary"
+
+    def get_synced_key(self, session_id: str, user_id: str) -> str:
+        """Key of the seq the sync has persisted the session through; only the sync writes it."""
+        return f"user:{user_id}:session:{session_id}:synced"
+
+    def get_dirty_member(self, session_id: str, user_id: str) -> str:
+        return f"{user_id}:{session_id}"
+
+    def serialize_message(self, message: Union[AIMessage, HumanMessage], seq: Optional[int] = None,
+                          timestamp: Optional[str] = None) -> str:
+        """Converts a HumanMessage or AIMessage to JSON, with its id, token count (and sequence number, append time) alongside."""
+        data = {
+            "id": message.id,
             "type": "human" if isinstance(message, HumanMessage) else "ai",
-            "content": message.content
-        })
+            "content": message.content,
+            "tokens": count_tokens(message.content)
+        }
+        if seq is not None:
+            data["seq"] = seq
+        if timestamp is not None:
+            data["timestamp"] = timestamp
+        return json.dumps(data)
 
     def deserialize_message(self, raw: bytes) -> Union[AIMessage, HumanMessage]:
-        """Deserializes Redis-stored JSON back into a Langchain Message."""
+        """Deserializes Redis-stored JSON back into a Langchain Message (token count and sequence number in response_metadata)."""
         data = json.loads(raw.decode("utf-8"))
-        return AIMessage(data["content"]) if data["type"] == "ai" else HumanMessage(data["content"])
+        message_class = AIMessage if data["type"] == "ai" else HumanMessage
+        metadata = {key: data[key] for key in ("tokens", "seq") if key in data}
+        return message_class(content=data["content"], id=data.get("id"), response_metadata=metadata)
 
-    def save_message(self, session_id: str, user_id: str, message: Union[AIMessage, HumanMessage]) -> None:
-        """Saves a message to Redis after validating DB session ownership."""
-        # Ownership check + prompt limit enforcement
-        session = self.db_manager.get_chat_session(session_id=session_id, user_id=user_id)
-        if session.prompts_count >= 20:
-            raise Exception(f"Prompt limit reached for session {session_id}.")
+    @property
+    def write_behind(self) -> bool:
+        return self.write_stream is not None
 
-        # Save to Redis
-        redis_key = self.get_session_key(session_id, user_id)
-        self.client.rpush(redis_key, self.serialize_message(message))
-        self.client.ltrim(redis_key, -20, -1)  # Keep only last 20 messages
+    def _append_args(self, session_id: str, user_id: str, message: Union[AIMessage, HumanMessage]) -> tuple:
+        """
+        Keys and arguments of APPEND_MESSAGE_LUA (seed left unknown), with the stream entry under write-behind.
+        The append time is stored with the entry, so a message persisted later by the sync keeps its place.
+        """
+        message.id = message.id or str(uuid.uuid4())  # kept by every writer that persists the message
+        timestamp = datetime.utcnow().isoformat()
+        serialized = self.serialize_message(message, timestamp=timestamp)
+        keys = [self.get_session_key(session_id, user_id), self.get_counter_key(session_id, user_id), DIRTY_SESSIONS_KEY]
+        args = [serialized, PROMPT_LIMIT, HISTORY_LENGTH, -1, HISTORY_TTL, self.get_dirty_member(session_id, user_id)]
+        if self.write_behind:
+            # The message id makes the Postgres insert idempotent when entries are replayed
+            entry = {
+                "id": message.id,
+                "session_id": session_id,
+                "user_id": user_id,
+                "role": "human" if isinstance(message, HumanMessage) else "ai",
+                "content": message.content,
+                "timestamp": timestamp,
+            }
+            keys.append(self.write_stream)
+            args.extend(item for pair in entry.items() for item in pair)
+        return keys, args
+
+    def get_summary(self, session_id: str, user_id: str) -> Optional[dict]:
+        raw = self.client.get(self.get_summary_key(session_id, user_id))
+        return json.loads(raw) if raw else None
+
+    def set_summary(self, session_id: str, user_id: str, summary: dict) -> None:
+        """Stored with the history's TTL, so it never outlives the messages it summarizes."""
+        self.client.set(self.get_summary_key(session_id, user_id), json.dumps(summary), ex=HISTORY_TTL)
+
+    def save_message(self, session_id: str, user_id: str, message: Union[AIMessage, HumanMessage]) -> int:
+        """
+        Appends a message to the Redis history.
+        - One Lua call checks the prompt limit, appends, trims and increments the counter
+          atomically. The counter is seeded from Postgres (with the ownership check) only when
+          Redis does not know the session yet.
+        - Under write-behind, the same call adds the message to the write stream.
+        Returns the message's sequence number, i.e. the session's prompt count after the append.
+        """
+        keys, args = self._append_args(session_id, user_id, message)
+        count = self.append_script(keys=keys, args=args)
+        if count == -2:
+            # Ownership check + counter seed, once per session and Redis lifetime
+            session = self.db_manager.get_chat_session(session_id=session_id, user_id=user_id)
+            args[3] = session.prompts_count
+            count = self.append_script(keys=keys, args=args)
+        if count == -1:
+            raise PromptLimitReachedException(f"Prompt limit reached for session {session_id}.")
+        return count
+
+    def replace_last_ai_message(self, session_id: str, user_id: str, content: str) -> Optional[Dict]:
+        """
+        Replaces the content of the session's last AI message, e.g. with the script that finally rendered.
+        An edit, not an append: the prompt counter and the dirty set are left alone.
+        Returns the updated entry (id, seq, timestamp, ...), or None if there is no AI message.
+        """
+        raw = self.replace_last_ai_script(keys=[self.get_session_key(session_id, user_id)],
+                                          args=[content, count_tokens(content)])
+        return json.loads(raw) if raw else None
+
+    def backfill_history(self, session_id: str, user_id: str, messages: List[Union[AIMessage, HumanMessage]]) -> int:
+        """
+        Writes a history loaded from Postgres in one round-trip (RPUSH + LTRIM + EXPIRE).
+        The caller has already verified ownership and the messages were counted when first
+        saved, so there are no per-message checks. A history written meanwhile is kept.
+        `messages` is the whole persisted history in order, so positions are sequence numbers.
+        Returns the number of messages written.
+        """
+        if not messages:
+            return 0
+        serialized = self._serialize_tail(messages)
+        return self.backfill_script(keys=[self.get_session_key(session_id, user_id)],
+                                    args=[HISTORY_LENGTH, HISTORY_TTL, *serialized])
 
-        # Save to DB
-        # self.db_manager.save_message(session_id=session_id, user_id=user_id, role=message.type, content=message.content)
+    def _serialize_tail(self, messages: List[Union[AIMessage, HumanMessage]]) -> List[str]:
+        first_seq = max(len(messages) - HISTORY_LENGTH, 0) + 1
+        return [self.serialize_message(message, seq=first_seq + index)
+                for index, message in enumerate(messages[-HISTORY_LENGTH:])]
 
     def session_exists(self, session_id: str, user_id: str) -> bool:
         """Check if a Redis history exists for this user’s session."""
         return self.client.exists(self.get_session_key(session_id, user_id)) > 0
 
     def get_session_history(self, session_id: str, user_id: str) -> List[Union[AIMessage, HumanMessage]]:
-        """Retrieve last 20 messages from Redis after ownership verification."""
-        # Ownership validation
-        self.db_manager.get_chat_session(session_id=session_id, user_id=user_id)
-
-        if not self.session_exists(session_id, user_id):
-            return []
+        """Retrieve last 20 messages from Redis after ownership verification (cached, see SessionCache)."""
+        self.session_cache.verify(session_id=session_id, user_id=user_id)
 
         redis_key = self.get_session_key(session_id, user_id)
         raw_messages = self.client.lrange(redis_key, 0, -1)
         return [self.deserialize_message(msg) for msg in raw_messages]
 
-    def get_all_session_keys(self, user_id: str) -> List[str]:
-        """Returns all session keys for the current user."""
-        keys = self.client.keys(f"user:{user_id}:session:*:history")
-        return [key.decode("utf-8") for key in keys]
+    def get_all_session_keys(self, user_id: str = "*") -> List[str]:
+        """Returns all session history keys of a user (every user by default), walked with SCAN."""
+        return [key.decode("utf-8") for key in self.client.scan_iter(match=f"user:{user_id}:session:*:history", count=500)]
+
+    def iter_dirty_sessions(self, batch_size: int = 200) -> Iterator[List[Tuple[str, str]]]:
+        """Batches of (user_id, session_id) appended to since their last sync, walked with SSCAN."""
+        batch = []
+        for member in self.client.sscan_iter(DIRTY_SESSIONS_KEY, count=batch_size):
+            user_id, session_id = member.decode("utf-8").split(":", 1)
+            batch.append((user_id, session_id))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def get_sync_state(self, sessions: List[Tuple[str, str]]) -> List[Tuple[Optional[int], int, List[Dict]]]:
+        """
+        For each (user_id, session_id): prompt counter, seq the session is synced through and the
+        raw history entries after it, read atomically in one round-trip.
+        """
+        keys = []
+        for user_id, session_id in sessions:
+            keys += [self.get_counter_key(session_id, user_id), self.get_synced_key(session_id, user_id),
+                     self.get_session_key(session_id, user_id)]
+        states = []
+        for count, synced, raw_messages in self.sync_state_script(keys=keys):
+            entries = [json.loads(raw) for raw in raw_messages]
+            states.append((int(count) if count is not None else None, int(synced),
+                           [entry for entry in entries if entry.get("seq", synced + 1) > synced]))
+        return states
+
+    def mark_synced(self, session_id: str, user_id: str, seq: int) -> bool:
+        """Records the session as persisted through `seq`; clears its dirty mark if nothing was appended after it."""
+        return bool(self.mark_synced_script(
+            keys=[DIRTY_SESSIONS_KEY, self.get_counter_key(session_id, user_id), self.get_synced_key(session_id, user_id)],
+            args=[self.get_dirty_member(session_id, user_id), seq, HISTORY_TTL]
+        ))
 
     def clear_session(self, session_id: str, user_id: str) -> None:
         """Deletes Redis chat history for a user’s session."""
         redis_key = self.get_session_key(session_id, user_id)
-        self.client.delete(redis_key)
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.delete(redis_key, self.get_summary_key(session_id, user_id), self.get_counter_key(session_id, user_id),
+                        self.get_synced_key(session_id, user_id))
+            pipe.srem(DIRTY_SESSIONS_KEY, self.get_dirty_member(session_id, user_id))
+            pipe.execute()
+
+    # Async variants used by the request path
+
+    async def asave_message(self, session_id: str, user_id: str, message: Union[AIMessage, HumanMessage]) -> int:
+        """Async save_message: atomic limit check + append + trim in one round-trip."""
+        keys, args = self._append_args(session_id, user_id, message)
+        count = await self.aappend_script(keys=keys, args=args)
+        if count == -2:
+            session = await self.db_manager.aget_chat_session(session_id=session_id, user_id=user_id)
+            args[3] = session.prompts_count
+            count = await self.aappend_script(keys=keys, args=args)
+        if count == -1:
+            raise PromptLimitReachedException(f"Prompt limit reached for session {session_id}.")
+        return count
+
+    async def abackfill_history(self, session_id: str, user_id: str,
+                                messages: List[Union[AIMessage, HumanMessage]]) -> int:
+        if not messages:
+            return 0
+        serialized = self._serialize_tail(messages)
+        return await self.abackfill_script(keys=[self.get_session_key(session_id, user_id)],
+                                           args=[HISTORY_LENGTH, HISTORY_TTL, *serialized])
+
+    async def aget_session_history(self, session_id: str, user_id: str) -> List[Union[AIMessage, HumanMessage]]:
+        """Retrieve last 20 messages from Redis after ownership verification (cached, see SessionCache)."""
+        await self.session_cache.averify(session_id=session_id, user_id=user_id)
+
+        raw_messages = await self.aclient.lrange(self.get_session_key(session_id, user_id), 0, -1)
+        return [self.deserialize_message(msg) for msg in raw_messages]
+
+    async def aget_summary(self, session_id: str, user_id: str) -> Optional[dict]:
+        raw = await self.aclient.get(self.get_summary_key(session_id, user_id))
+        return json.loads(raw) if raw else None
+
+    async def aset_summary(self, session_id: str, user_id: str, summary: dict) -> None:
+        await self.aclient.set(self.get_summary_key(session_id, user_id), json.dumps(summary), ex=HISTORY_TTL)
+
+    async def aclear_session(self, session_id: str, user_id: str) -> None:
+        async with self.aclient.pipeline(transaction=False) as pipe:
+            pipe.delete(self.get_session_key(session_id, user_id), self.get_summary_key(session_id, user_id),
+                        self.get_counter_key(session_id, user_id), self.get_synced_key(session_id, user_id))
+            pipe.srem(DIRTY_SESSIONS_KEY, self.get_dirty_member(session_id, user_id))
+            await pipe.execute()
+
+    async def acache_session(self, session: dict) -> None:
+        await self.session_cache.aput(session["id"], SessionCache.to_meta(session))
+
+    async def aforget_session(self, session_id: str, user_id: str) -> None:
+        await self.session_cache.ainvalidate(session_id)
+        await self.aclear_session(session_id=session_id, user_id=user_id)
@@ -0,0 +1,73 @@
+import ast
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from app.utils.file_manager import atomic_copy, touch, evict_lru
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+
+class RenderCache:
+    def __init__(self, cache_dir: str = "cache/renders", max_bytes: int = 2 * 1024 ** 3):
+        """
+        Content-addressed store of rendered videos.
+        - Keyed on the normalized script plus render quality.
+        - Bounded on disk with least-recently-used eviction.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize_script(script: str) -> str:
+        """
+        Canonical form of a script: the AST dump ignores comments, blank lines and formatting.
+        Falls back to whitespace-stripped lines if the script does not parse.
+        """
+        try:
+            return ast.dump(ast.parse(script))
+        except SyntaxError:
+            return "\n".join(line.rstrip() for line in script.strip().splitlines() if line.strip())
+
+    def make_key(self, script: str, quality: str) -> str:
+        normalized = self.normalize_script(script)
+        return hashlib.sha256(f"{quality}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.mp4"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the cached video for a key, or None on a miss. Logs the running hit/miss counts."""
+        path = self.get_path(key)
+        with self.lock:
+            hit = path.exists()
+            if hit:
+                self.hits += 1
+                touch(path)
+            else:
+                self.misses += 1
+        logger.info(f"Render cache {'hit' if hit else 'miss'}: {key[:12]} ({self.stats()})")
+        return path if hit else None
+
+    def put(self, key: str, video_path: Path) -> Path:
+        """Copy a freshly rendered video into the cache and enforce the size bound."""
+        path = self.get_path(key)
+        atomic_copy(video_path, path)
+        logger.info(f"Render cached: {key[:12]}")
+        evict_lru(self.cache_dir, self.max_bytes, "*.mp4")
+        return path
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
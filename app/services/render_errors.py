@@ -0,0 +1,139 @@
+import os
+import re
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+# NOTE: imported by render worker processes; keep free of application imports.
+
+# Guidance handed to the repair loop for failures that are not ordinary Python exceptions
+LIMIT_HINTS = {
+    "timeout": "The scene takes too long to render or never finishes. Remove unbounded loops, "
+               "shorten run_time/wait() durations and reduce the number of animations.",
+    "cpu_limit": "The scene uses too much CPU time. Reduce the number of animations, frames and "
+                 "mobjects (e.g. fewer dots/particles, lower sample counts).",
+    "memory_limit": "The scene uses too much memory. Create far fewer mobjects and avoid building "
+                    "huge lists or high-resolution surfaces.",
+    "latex": "Fix the LaTeX shown in the error: use raw strings (r\"...\") or escape backslashes, "
+             "balance braces, or use Text() for plain text.",
+}
+
+_ANSI = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+_BOX_CHARS = re.compile(r"[│┃╭╮╰╯─━]+")
+_EXCEPTION_LINE = re.compile(r"^([A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt))(?::\s*(.*))?$")
+# Plain tracebacks: File "/x/scene.py", line 12 ; rich tracebacks: /x/scene.py:12 in construct
+_FRAME_LINE = re.compile(r'File "(?P<file>[^"]+)", line (?P<line>\d+)|(?P<rfile>\S+\.py):(?P<rline>\d+) in ')
+_LATEX_START = re.compile(r"^!\s|LaTeX compilation error|latex error converting", re.IGNORECASE)
+LATEX_EXCERPT_LINES = 6
+
+
+class OutputTail:
+    """Keeps only the last `max_lines` lines of a process' output, each cut to `max_line_chars`."""
+
+    def __init__(self, max_lines: int = 200, max_line_chars: int = 500):
+        self.lines: deque = deque(maxlen=max_lines)
+        self.max_line_chars = max_line_chars
+
+    def append(self, line: str) -> None:
+        self.lines.append(line.rstrip("\n")[:self.max_line_chars])
+
+    def __iter__(self):
+        return iter(list(self.lines))
+
+
+def _clean(lines: Iterable[str]) -> List[str]:
+    """Drop ANSI codes, rich box drawing and blank lines."""
+    cleaned = (_BOX_CHARS.sub(" ", _ANSI.sub("", line)).strip() for line in lines)
+    return [line for line in cleaned if line]
+
+
+def _latex_excerpt(lines: List[str]) -> Optional[str]:
+    for i, line in enumerate(lines):
+        if _LATEX_START.search(line):
+            return "\n".join(lines[i:i + LATEX_EXCERPT_LINES])
+    return None
+
+
+def _source_line(script_path: Optional[str], line: Optional[int]) -> Optional[str]:
+    if not script_path or not line:
+        return None
+    try:
+        with open(script_path, encoding="utf-8") as f:
+            for number, text in enumerate(f, start=1):
+                if number == line:
+                    return text.strip()
+    except OSError:
+        pass
+    return None
+
+
+@dataclass
+class RenderError:
+    """Why a render failed, in a compact form the repair loop can act on."""
+    kind: str  # exception | latex | timeout | cpu_limit | memory_limit | crashed | cancelled
+    message: str
+    hint: Optional[str] = None
+    exception_type: Optional[str] = None
+    line: Optional[int] = None  # offending line of the rendered script
+    source_line: Optional[str] = None
+    latex_excerpt: Optional[str] = None
+
+    @classmethod
+    def limit(cls, kind: str, message: str) -> "RenderError":
+        return cls(kind=kind, message=message, hint=LIMIT_HINTS.get(kind))
+
+    @classmethod
+    def from_exception(cls, exc: BaseException, script_path: str, log_lines: Iterable[str] = ()) -> "RenderError":
+        """Build from an exception raised while rendering `script_path` in-process."""
+        script_name = os.path.basename(script_path)
+        line = source_line = None
+        if isinstance(exc, SyntaxError) and os.path.basename(exc.filename or "") == script_name:
+            line, source_line = exc.lineno, (exc.text or "").strip()
+        else:
+            frames = [frame for frame in traceback.extract_tb(exc.__traceback__)
+                      if os.path.basename(frame.filename) == script_name]
+            if frames:
+                line, source_line = frames[-1].lineno, frames[-1].line
+        latex_excerpt = _latex_excerpt(_clean(log_lines))
+        kind = "latex" if latex_excerpt else "exception"
+        return cls(kind=kind, message=str(exc), hint=LIMIT_HINTS.get(kind), exception_type=type(exc).__name__,
+                   line=line, source_line=source_line, latex_excerpt=latex_excerpt)
+
+    @classmethod
+    def from_output(cls, output: Iterable[str], script_path: Optional[str] = None) -> "RenderError":
+        """Parse the (tail of the) output of a failed `manim` CLI run."""
+        lines = _clean(output)
+
+        exception_type, message = None, None
+        for text in reversed(lines):
+            match = _EXCEPTION_LINE.match(text)
+            if match:
+                exception_type, message = match.group(1), match.group(2) or ""
+                break
+
+        line = None
+        script_name = os.path.basename(script_path) if script_path else None
+        for text in lines:
+            for match in _FRAME_LINE.finditer(text):
+                frame_file = match.group("file") or match.group("rfile")
+                if script_name and os.path.basename(frame_file) == script_name:
+                    line = int(match.group("line") or match.group("rline"))
+
+        latex_excerpt = _latex_excerpt(lines)
+        kind = "latex" if latex_excerpt else "exception"
+        if message is None:
+            message = "\n".join(lines[-10:]) or "manim exited without output"
+        return cls(kind=kind, message=message, hint=LIMIT_HINTS.get(kind), exception_type=exception_type,
+                   line=line, source_line=_source_line(script_path, line), latex_excerpt=latex_excerpt)
+
+    def __str__(self) -> str:
+        text = f"[{self.kind}] "
+        text += f"{self.exception_type}: {self.message}" if self.exception_type else self.message
+        if self.line:
+            text += f"\nScript line {self.line}: {self.source_line or ''}".rstrip()
+        if self.latex_excerpt:
+            text += f"\nLaTeX error:\n{self.latex_excerpt}"
+        if self.hint:
+            text += f"\nHow to fix: {self.hint}"
+        return text
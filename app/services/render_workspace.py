@@ -0,0 +1,98 @@
+import uuid
+import shutil
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+# manim -q flag -> (pixel height, default frame rate)
+QUALITY_PRESETS = {"l": (480, 15), "m": (720, 30), "h": (1080, 60), "p": (1440, 60), "k": (2160, 60)}
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+
+def make_settings_key(quality: str, frame_rate: Optional[int] = None) -> str:
+    """Identifies render settings, e.g. "l@10"; a missing frame rate means the preset's."""
+    return f"{quality}@{frame_rate or QUALITY_PRESETS[quality][1]}"
+
+
+def render_cost(quality: str, frame_rate: Optional[int] = None) -> int:
+    """Relative encode work of the settings: pixels per frame times frames per second."""
+    height, default_rate = QUALITY_PRESETS[quality]
+    return height * height * (frame_rate or default_rate)
+
+
+class RenderWorkspace:
+    def __init__(self, root: Optional[str] = None, quality: str = "l", frame_rate: Optional[int] = None,
+                 output_id: Optional[str] = None, cancel_event: Optional[threading.Event] = None,
+                 background: bool = False):
+        """
+        Private scratch directory for one render job.
+        - `quality` (manim -q flag) and optional `frame_rate` override fix the render settings.
+        - Holds the job's scripts and manim media dir, so jobs never share paths.
+        - `output_id` names the published video, independent of the LLM's class name.
+        - Setting `cancel_event` aborts renders running in this workspace.
+        - `background` renders (final-quality upgrades) stay off the warm worker pool,
+          which is sized and limited for previews.
+        - Every attempt is saved as the same `scene.py`, so manim's partial-movie cache
+          under `media_dir` is reused across retries of the job (Tex lives in the shared TexCache).
+        - Removed on exit; use as a context manager.
+        """
+        self.output_id = output_id or uuid.uuid4().hex
+        self.quality = quality
+        self.frame_rate = frame_rate
+        self.background = background
+        self.cancel_event = cancel_event or threading.Event()
+        if root:
+            Path(root).mkdir(parents=True, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix=f"render-{self.output_id[:8]}-", dir=root))
+        self.scripts_dir = self.path / "scripts"
+        self.media_dir = self.path / "media"
+        self.scripts_dir.mkdir()
+        self.media_dir.mkdir()
+        self.script_path = self.scripts_dir / "scene.py"
+        self.stats: Dict[str, int] = {"partials_reused": 0, "partials_rendered": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def quality_dir(self) -> str:
+        """Folder manim names after the output resolution and frame rate, e.g. 480p15."""
+        height, default_rate = QUALITY_PRESETS[self.quality]
+        return f"{height}p{self.frame_rate or default_rate}"
+
+    @property
+    def settings_key(self) -> str:
+        """Identifies the render settings, e.g. for cache keys."""
+        return make_settings_key(self.quality, self.frame_rate)
+
+    def video_path(self, script_filename: str, class_name: str) -> Path:
+        """Where manim writes a scene's video (folder is named after the script module)."""
+        module_name = Path(script_filename).stem
+        return self.media_dir / "videos" / module_name / self.quality_dir / f"{class_name}.mp4"
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def record_stats(self, stats: Dict[str, int]) -> None:
+        """Accumulate per-render counters (renders of one job may run on several threads)."""
+        with self.lock:
+            for key, value in stats.items():
+                self.stats[key] = self.stats.get(key, 0) + value
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+        logger.info(f"Removed render workspace {self.path}")
+
+    def __enter__(self) -> "RenderWorkspace":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.cleanup()
@@ -0,0 +1,192 @@
+import re
+import ast
+import logging
+import warnings
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+# Names from older Manim versions (and manimgl) -> current Manim Community equivalent
+RENAMED_NAMES = {
+    "ShowCreation": "Create",
+    "ShowCreationThenDestruction": "ShowPassingFlash",
+    "TextMobject": "Tex",
+    "TexMobject": "MathTex",
+    "FadeInFrom": "FadeIn",
+    "FadeInFromDown": "FadeIn",
+    "FadeOutAndShift": "FadeOut",
+    "FadeOutAndShiftDown": "FadeOut",
+    "GrowFromEdge": "GrowFromPoint",
+    "ContinualAnimation": "Animation",
+}
+
+# Methods renamed in Manim Community, only rewritten when the error names them
+RENAMED_ATTRIBUTES = {
+    "get_graph": "plot",
+    "get_derivative_graph": "plot_derivative_graph",
+    "get_parametric_curve": "plot_parametric_curve",
+    "get_implicit_curve": "plot_implicit_curve",
+}
+
+# Calls whose string arguments are LaTeX source
+TEX_CALLS = {"Tex", "MathTex", "TexMobject", "TextMobject", "SingleStringMathTex", "Title", "BulletedList"}
+
+# Characters Python produces from LaTeX commands like \frac, \theta, \beta, \alpha, \vec, \right
+ESCAPED_CONTROL_CHARS = set("\a\b\f\v\r\t")
+
+_STRING_LITERAL = re.compile(r"^(?P<quote>'''|\"\"\"|'|\")(?P<body>.*)(?P=quote)$", re.DOTALL)
+_MISSING_ATTRIBUTE = re.compile(r"has no attribute '(\w+)'")
+
+Rule = Callable[[str, ast.Module, str], Optional[str]]
+
+
+def _replace_spans(script: str, spans: List[Tuple[int, int, int, str]]) -> str:
+    """Apply (lineno, start_col, end_col, text) replacements; columns are UTF-8 byte offsets as in the AST."""
+    lines = script.splitlines(keepends=True)
+    for lineno, start, end, text in sorted(spans, reverse=True):
+        raw = lines[lineno - 1].encode("utf-8")
+        lines[lineno - 1] = (raw[:start] + text.encode("utf-8") + raw[end:]).decode("utf-8")
+    return "".join(lines)
+
+
+def _bound_names(tree: ast.Module) -> set:
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+    return names
+
+
+def fix_renamed_names(script: str, tree: ast.Module, error: str) -> Optional[str]:
+    """ShowCreation(...) -> Create(...), TexMobject(...) -> MathTex(...), ..."""
+    bound = _bound_names(tree)
+    spans = [
+        (node.lineno, node.col_offset, node.end_col_offset, RENAMED_NAMES[node.id])
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and node.id in RENAMED_NAMES and node.id not in bound
+    ]
+    return _replace_spans(script, spans) if spans else None
+
+
+def fix_renamed_attributes(script: str, tree: ast.Module, error: str) -> Optional[str]:
+    """axes.get_graph(...) -> axes.plot(...), only for the attribute the AttributeError names."""
+    match = _MISSING_ATTRIBUTE.search(error)
+    if not match or match.group(1) not in RENAMED_ATTRIBUTES:
+        return None
+    old, new = match.group(1), RENAMED_ATTRIBUTES[match.group(1)]
+    spans = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr == old:
+            # The attribute name is the last token of the node's source span
+            end = node.end_col_offset
+            spans.append((node.end_lineno, end - len(old.encode("utf-8")), end, new))
+    return _replace_spans(script, spans) if spans else None
+
+
+def fix_missing_manim_import(script: str, tree: ast.Module, error: str) -> Optional[str]:
+    """Prepend `from manim import *` when the script never imports manim."""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and (node.module or "").split(".")[0] == "manim":
+            return None
+        if isinstance(node, ast.Import) and any(alias.name.split(".")[0] == "manim" for alias in node.names):
+            return None
+    if "from manim import" not in error and "NameError" not in error and "is not defined" not in error:
+        return None
+    return "from manim import *\n" + script
+
+
+def fix_unescaped_latex(script: str, tree: ast.Module, error: str) -> Optional[str]:
+    """
+    Turn LaTeX string literals into raw strings: "\\frac{a}{b}" written as "\frac{a}{b}"
+    reaches LaTeX as a form feed followed by "rac{a}{b}".
+    """
+    mentions_latex = re.search(r"latex|\btex\b|escape sequence", error, re.IGNORECASE)
+    spans = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and getattr(node.func, "id", getattr(node.func, "attr", None)) in TEX_CALLS):
+            continue
+        for arg in node.args:
+            if not (isinstance(arg, ast.Constant) and isinstance(arg.value, str) and arg.lineno == arg.end_lineno):
+                continue
+            source = ast.get_source_segment(script, arg)
+            match = _STRING_LITERAL.match(source or "")
+            # Already raw/prefixed, implicitly concatenated, or written with explicit "\\"
+            if not match or "\\" not in match.group("body") or "\\\\" in match.group("body"):
+                continue
+            if not mentions_latex and not ESCAPED_CONTROL_CHARS & set(arg.value):
+                continue
+            spans.append((arg.lineno, arg.col_offset, arg.end_col_offset, "r" + source))
+    return _replace_spans(script, spans) if spans else None
+
+
+class ScriptAutoFixer:
+    """
+    Rule-based repairs for mechanical failures, tried before asking the LLM.
+    Each rule inspects the error text and the script AST and returns a rewritten script or None.
+    """
+
+    RULES: List[Tuple[str, Rule]] = [
+        ("missing_manim_import", fix_missing_manim_import),
+        ("renamed_names", fix_renamed_names),
+        ("renamed_attributes", fix_renamed_attributes),
+        ("unescaped_latex", fix_unescaped_latex),
+    ]
+
+    def __init__(self):
+        self.hits: Counter = Counter()
+        self.attempts = 0
+        self.resolved = 0
+        self.lock = threading.Lock()
+
+    def fix(self, script: str, error: str) -> Optional[Tuple[str, List[str]]]:
+        """
+        Apply every matching rule in order.
+
+        Returns:
+            Optional[Tuple[str, List[str]]]: (fixed_script, applied rule names), or None when no rule applies
+        """
+        applied = []
+        for name, rule in self.RULES:
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", SyntaxWarning)  # "\s"-style LaTeX escapes
+                    tree = ast.parse(script)
+            except SyntaxError:
+                break
+            try:
+                fixed = rule(script, tree, error)
+            except Exception as e:
+                logger.warning(f"Auto-fix rule '{name}' crashed: {e}")
+                continue
+            if fixed is not None and fixed != script:
+                script = fixed
+                applied.append(name)
+
+        with self.lock:
+            self.attempts += 1
+            if applied:
+                self.resolved += 1
+                self.hits.update(applied)
+        if not applied:
+            return None
+        logger.info(f"Auto-fixed script locally with: {', '.join(applied)}")
+        return script, applied
+
+    def stats(self) -> Dict[str, object]:
+        with self.lock:
+            return {
+                "attempts": self.attempts,
+                "resolved": self.resolved,
+                "hit_rate": self.resolved / self.attempts if self.attempts else 0.0,
+                "rules": dict(self.hits),
+            }
@@ -0,0 +1,176 @@
+import ast
+import builtins
+import logging
+import threading
+from typing import List, Optional, Set
+from app.utils.exceptions import ScriptValidationError
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+
+class ScriptPreflight:
+    """
+    Static checks run on generated scripts before any render is spent on them.
+    """
+
+    # Modules that give access to the filesystem, network, processes or the interpreter itself
+    FORBIDDEN_MODULES = {
+        "os", "sys", "subprocess", "shutil", "pathlib", "glob", "tempfile", "io", "socket", "ssl",
+        "http", "urllib", "requests", "httpx", "ftplib", "smtplib", "asyncio", "threading",
+        "multiprocessing", "signal", "ctypes", "importlib", "builtins", "pickle", "marshal", "shelve",
+    }
+    FORBIDDEN_CALLS = {"open", "exec", "eval", "compile", "__import__", "input", "breakpoint", "globals", "vars"}
+    FORBIDDEN_ATTRIBUTES = {"__globals__", "__builtins__", "__subclasses__", "__code__", "__import__", "__loader__"}
+
+    _manim_names: Optional[Set[str]] = None
+    _manim_lock = threading.Lock()
+
+    @classmethod
+    def manim_api(cls) -> Optional[Set[str]]:
+        """
+        Names exported by `from manim import *`, built once by introspecting the installed package.
+        Returns None when manim cannot be imported, in which case name checks are skipped.
+        """
+        with cls._manim_lock:
+            if cls._manim_names is None:
+                try:
+                    import manim
+                    cls._manim_names = {name for name in dir(manim) if not name.startswith("_")}
+                    logger.info(f"Indexed {len(cls._manim_names)} public Manim names")
+                except Exception as e:
+                    logger.warning(f"Manim API index unavailable, skipping name checks: {e}")
+                    cls._manim_names = set()
+            return cls._manim_names or None
+
+    def check(self, script: str) -> List[str]:
+        """
+        Validate a script and return the names of its Scene subclasses.
+        Raises ScriptValidationError listing every problem found.
+        """
+        try:
+            tree = ast.parse(script)
+        except SyntaxError as e:
+            raise ScriptValidationError(f"SyntaxError: {e.msg} (line {e.lineno}): {(e.text or '').strip()}")
+
+        problems: List[str] = []
+        scenes = self._find_scenes(tree, problems)
+        star_imports_manim = self._check_imports(tree, problems)
+        self._check_calls(tree, problems)
+        self._check_names(tree, star_imports_manim, problems)
+
+        if problems:
+            raise ScriptValidationError("Script failed preflight checks:\n" + "\n".join(f"- {p}" for p in problems))
+        return scenes
+
+    def _find_scenes(self, tree: ast.Module, problems: List[str]) -> List[str]:
+        classes = [node for node in tree.body if isinstance(node, ast.ClassDef)]
+        bases_of = {
+            node.name: [b.id if isinstance(b, ast.Name) else getattr(b, "attr", "") for b in node.bases]
+            for node in classes
+        }
+        # Helper base classes shared by other scenes are not rendered themselves
+        used_as_base = {name for bases in bases_of.values() for name in bases}
+
+        def is_scene(name: str, seen: Set[str] = frozenset()) -> bool:
+            return any(
+                base.endswith("Scene") or (base not in seen and is_scene(base, seen | {name}))
+                for base in bases_of.get(name, [])
+            )
+
+        scenes = []
+        for node in classes:
+            if node.name in used_as_base or not is_scene(node.name):
+                continue
+            scenes.append(node.name)
+            construct = next(
+                (item for item in node.body if isinstance(item, ast.FunctionDef) and item.name == "construct"),
+                None
+            )
+            if construct is None:
+                problems.append(f"Scene class '{node.name}' (line {node.lineno}) has no construct(self) method")
+            elif not construct.args.args:
+                problems.append(f"'{node.name}.construct' (line {construct.lineno}) must take `self`")
+
+        if not scenes:
+            problems.append("No Manim Scene subclass found in the script")
+        return scenes
+
+    def _check_imports(self, tree: ast.Module, problems: List[str]) -> bool:
+        """Reject forbidden imports; return whether the script does `from manim import *`."""
+        star_imports_manim = False
+        has_manim_import = False
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                modules = [node.module or ""]
+                if node.module == "manim" and any(alias.name == "*" for alias in node.names):
+                    star_imports_manim = True
+            else:
+                continue
+            for module in modules:
+                root = module.split(".")[0]
+                if root == "manim":
+                    has_manim_import = True
+                if root in self.FORBIDDEN_MODULES:
+                    problems.append(f"Forbidden import '{module}' (line {node.lineno}): filesystem, network and process access are not allowed")
+
+        if not has_manim_import:
+            problems.append("Missing `from manim import *`")
+        return star_imports_manim
+
+    def _check_calls(self, tree: ast.Module, problems: List[str]) -> None:
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in self.FORBIDDEN_CALLS:
+                problems.append(f"Forbidden call '{node.func.id}()' (line {node.lineno})")
+            elif isinstance(node, ast.Attribute) and node.attr in self.FORBIDDEN_ATTRIBUTES:
+                problems.append(f"Forbidden attribute access '{node.attr}' (line {node.lineno})")
+
+    def _check_names(self, tree: ast.Module, star_imports_manim: bool, problems: List[str]) -> None:
+        """Flag names that are neither defined in the script, builtins, nor part of the Manim API."""
+        manim_names = self.manim_api()
+        if manim_names is None:
+            return
+
+        known = set(dir(builtins)) | self._bound_names(tree)
+        if star_imports_manim:
+            known |= manim_names
+
+        reported = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in known:
+                if node.id in reported:
+                    continue
+                reported.add(node.id)
+                problems.append(
+                    f"NameError: '{node.id}' (line {node.lineno}) is not defined and is not part of the installed Manim API"
+                )
+
+    @staticmethod
+    def _bound_names(tree: ast.Module) -> Set[str]:
+        """Every name the script binds anywhere (scope-insensitive, so it never over-reports)."""
+        names: Set[str] = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+                names.add(node.id)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                names.add(node.name)
+            elif isinstance(node, ast.arg):
+                names.add(node.arg)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    if alias.name != "*":
+                        names.add((alias.asname or alias.name).split(".")[0])
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                names.add(node.name)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                names.update(node.names)
+            elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+                names.add(node.name)
+        return names
@@ -0,0 +1,123 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+
+class SessionCache:
+    def __init__(self, client, aclient, db_manager, l1_ttl: int = 60, l1_max_entries: int = 10000):
+        """
+        Session -> owner/metadata cache, so ownership checks on the history path skip Postgres.
+        - L2: a Redis hash per session, shared by every server process.
+        - L1: an in-process LRU with a short TTL; other processes' deletes reach it within `l1_ttl`.
+        - Filled when a session is created (or on the first miss), dropped when it is deleted.
+        """
+        self.client = client
+        self.aclient = aclient
+        self.db_manager = db_manager
+        self.l1_ttl = l1_ttl
+        self.l1_max_entries = l1_max_entries
+        self.l1: "OrderedDict[str, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_meta_key(self, session_id: str) -> str:
+        return f"session:{session_id}:meta"
+
+    @staticmethod
+    def to_meta(session) -> Dict[str, str]:
+        """Metadata of a ChatSession row (or the dict returned by create_session)."""
+        get = session.get if isinstance(session, dict) else lambda name: getattr(session, name)
+        created_at = get("created_at")
+        return {
+            "user_id": str(get("user_id")),
+            "name": str(get("name")),
+            "created_at": created_at if isinstance(created_at, str) else created_at.isoformat(),
+        }
+
+    # L1
+
+    def _l1_get(self, session_id: str) -> Optional[Dict[str, str]]:
+        with self.lock:
+            entry = self.l1.get(session_id)
+            if not entry:
+                return None
+            expires_at, meta = entry
+            if expires_at < time.time():
+                del self.l1[session_id]
+                return None
+            self.l1.move_to_end(session_id)
+            return meta
+
+    def _l1_put(self, session_id: str, meta: Dict[str, str]) -> None:
+        with self.lock:
+            self.l1[session_id] = (time.time() + self.l1_ttl, meta)
+            self.l1.move_to_end(session_id)
+            while len(self.l1) > self.l1_max_entries:
+                self.l1.popitem(last=False)
+
+    def _l1_drop(self, session_id: str) -> None:
+        with self.lock:
+            self.l1.pop(session_id, None)
+
+    @staticmethod
+    def _decode(raw: Dict) -> Dict[str, str]:
+        return {k.decode("utf-8") if isinstance(k, bytes) else k: v.decode("utf-8") if isinstance(v, bytes) else v
+                for k, v in raw.items()}
+
+    @staticmethod
+    def _check_owner(session_id: str, user_id: str, meta: Dict[str, str]) -> Dict[str, str]:
+        if meta.get("user_id") != str(user_id):
+            raise ValueError(f"Session {session_id} does not belong to user {user_id}")
+        return meta
+
+    # Sync API
+
+    def put(self, session_id: str, meta: Dict[str, str]) -> None:
+        self.client.hset(self.get_meta_key(session_id), mapping=meta)
+        self._l1_put(session_id, meta)
+
+    def verify(self, session_id: str, user_id: str) -> Dict[str, str]:
+        """Metadata of a session owned by `user_id`; raises ValueError otherwise (like the DB check)."""
+        meta = self._l1_get(session_id)
+        if meta is None:
+            raw = self.client.hgetall(self.get_meta_key(session_id))
+            if raw:
+                meta = self._decode(raw)
+                self._l1_put(session_id, meta)
+        if meta is None:
+            session = self.db_manager.get_chat_session(session_id=session_id, user_id=user_id)
+            meta = self.to_meta(session)
+            self.put(session_id, meta)
+        return self._check_owner(session_id, user_id, meta)
+
+    # Async API
+
+    async def aput(self, session_id: str, meta: Dict[str, str]) -> None:
+        await self.aclient.hset(self.get_meta_key(session_id), mapping=meta)
+        self._l1_put(session_id, meta)
+
+    async def averify(self, session_id: str, user_id: str) -> Dict[str, str]:
+        meta = self._l1_get(session_id)
+        if meta is None:
+            raw = await self.aclient.hgetall(self.get_meta_key(session_id))
+            if raw:
+                meta = self._decode(raw)
+                self._l1_put(session_id, meta)
+        if meta is None:
+            session = await self.db_manager.aget_chat_session(session_id=session_id, user_id=user_id)
+            meta = self.to_meta(session)
+            await self.aput(session_id, meta)
+        return self._check_owner(session_id, user_id, meta)
+
+    async def ainvalidate(self, session_id: str) -> None:
+        self._l1_drop(session_id)
+        await self.aclient.delete(self.get_meta_key(session_id))
@@ -25,8 +25,8 @@ class SyncService:
             try:
                 with self.lock:
                     logger.info("Starting periodic sync from Redis to PostgreSQL...")
-                    self.memory_manager.sync_redis_to_postgres()
-                    logger.info("Periodic sync completed successfully.")
+                    inserted = self.memory_manager.sync_redis_to_postgres()
+                    logger.info(f"Periodic sync completed successfully ({inserted} messages persisted).")
             except Exception as e:
                 logger.error(f"Periodic sync error: {e}")
             sleep(self.sync_interval)
@@ -54,7 +54,7 @@ class SyncService:
         try:
             with self.lock:
                 logger.info("Starting manual sync from Redis to PostgreSQL...")
-                self.memory_manager.sync_redis_to_postgres()
-                logger.info("Manual sync completed successfully.")
+                inserted = self.memory_manager.sync_redis_to_postgres()
+                logger.info(f"Manual sync completed successfully ({inserted} messages persisted).")
         except Exception as e:
             logger.error(f"Manual sync error: {e}")
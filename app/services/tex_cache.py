@@ -0,0 +1,108 @@
+import os
+import sys
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from typing import List, Set
+from app.utils.file_manager import evict_lru
+
+# NOTE: run as `python -m app.services.tex_cache` to warm the cache; keep this module
+# free of imports that build the application context.
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+
+# Hashes (file stems) of the warm-up corpus, written by warm_up; these entries are never evicted
+WARM_MANIFEST = ".warm-corpus"
+
+
+class TexCache:
+    def __init__(self, cache_dir: str = "cache/tex", max_bytes: int = 512 * 1024 ** 2, min_age: int = 600):
+        """
+        On-disk LaTeX cache shared by every render worker.
+        - Manim names compiled Tex files by a hash of expression + template, so pointing all
+          workers at one `tex_dir` makes it a content-addressed, cross-job cache.
+        - Bounded by `max_bytes`, evicting oldest files first. Cache hits do not touch the files,
+          so the age is the compile time: the warm-up corpus (the entries most likely to be hit)
+          is pinned instead, and files younger than `min_age` seconds may belong to a compile
+          still in progress in another job, so they are left alone.
+        """
+        self.cache_dir = Path(cache_dir).resolve()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+
+    def warm_corpus(self) -> Set[str]:
+        try:
+            return set((self.cache_dir / WARM_MANIFEST).read_text(encoding="utf-8").split())
+        except FileNotFoundError:
+            return set()
+
+    def prune(self) -> int:
+        """Evict old entries, except the warm corpus and recent compiles, until the cache fits its size bound."""
+        pinned = self.warm_corpus()
+        return evict_lru(self.cache_dir, self.max_bytes, min_age=self.min_age,
+                         keep=lambda path: path.name == WARM_MANIFEST or path.stem in pinned)
+
+    def start_warm_up(self) -> subprocess.Popen:
+        """
+        Pre-compile the configured corpus in a background process (does not block startup).
+        A daemon thread waits for the process, so it is reaped instead of left a zombie.
+        """
+        logger.info("Starting Tex cache warm-up")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "app.services.tex_cache"],
+            env=os.environ.copy(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        threading.Thread(target=self._reap, args=(process,), name="tex-warm-up", daemon=True).start()
+        return process
+
+    @staticmethod
+    def _reap(process: subprocess.Popen) -> None:
+        returncode = process.wait()
+        if returncode:
+            logger.warning(f"Tex cache warm-up exited with code {returncode}")
+        else:
+            logger.info("Tex cache warm-up finished")
+
+
+def warm_up(tex_dir: str, expressions: List[str]) -> int:
+    """
+    Compile each expression exactly as MathTex would, so later renders hit the cache.
+    The compiled files are listed in the cache's manifest, which pins them against eviction.
+    """
+    from manim import MathTex, tempconfig
+
+    compiled = 0
+    stems = []
+    with tempconfig({"tex_dir": str(Path(tex_dir).resolve())}):
+        for expression in expressions:
+            try:
+                svg_file = getattr(MathTex(expression), "file_name", None)
+                compiled += 1
+            except Exception as e:
+                logger.warning(f"Could not pre-compile {expression!r}: {e}")
+                continue
+            if svg_file:
+                stems.append(Path(svg_file).stem)
+    (Path(tex_dir) / WARM_MANIFEST).write_text("\n".join(stems), encoding="utf-8")
+    logger.info(f"Tex cache warm-up compiled {compiled}/{len(expressions)} expressions")
+    return compiled
+
+
+if __name__ == "__main__":
+    from app.config.app_config import get_default_config
+
+    render_config = get_default_config().render
+    tex_cache = TexCache(render_config.tex_cache_dir, render_config.tex_cache_max_bytes)
+    warm_up(str(tex_cache.cache_dir), render_config.tex_warmup_expressions)
+    tex_cache.prune()
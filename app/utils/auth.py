@@ -10,7 +10,6 @@ from app.models.db_models import User
 SECRET_KEY = "your-secret"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
-db_session = app_context.db_manager.get_session()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str) -> str:
@@ -25,24 +24,18 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(request: Request) -> User:
-    db_session = app_context.db_manager.get_session()
+async def get_current_user(request: Request) -> User:
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(payload)
-        user_id = payload.get("sub")
-        print(user_id)
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user = db_session.query(User).filter_by(user_name=user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        return user
-    except Exception as e:
-        db_session.rollback()  # ✅ important
-        raise e
-    finally:
-        db_session.close()
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user = await app_context.db_manager.aget_user(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
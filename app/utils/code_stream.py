@@ -0,0 +1,39 @@
+import re
+from typing import Optional
+
+
+class FencedCodeExtractor:
+    """
+    Finds the first fenced code block in streamed text as soon as its closing fence arrives,
+    without rescanning the whole buffer on every chunk.
+    """
+
+    _OPENING_FENCE = re.compile(r"```[\w+-]*[ \t]*\n")
+
+    def __init__(self):
+        self.text = ""
+        self.code: Optional[str] = None
+        self._code_start: Optional[int] = None
+        self._scan_from = 0
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add a chunk; returns the code block once, on the chunk that closes it."""
+        self.text += chunk
+        if self.code is not None:
+            return None
+
+        if self._code_start is None:
+            match = self._OPENING_FENCE.search(self.text, max(0, self._scan_from - 16))
+            if not match:
+                self._scan_from = len(self.text)
+                return None
+            self._code_start = match.end()
+            self._scan_from = match.end()
+
+        # The closing fence starts a line; back up a little in case it was split across chunks
+        end = self.text.find("\n```", max(self._code_start - 1, self._scan_from - 4))
+        if end < 0:
+            self._scan_from = len(self.text)
+            return None
+        self.code = self.text[self._code_start:end]
+        return self.code
@@ -1,2 +1,22 @@
 class SessionLimitReachedException(Exception):
     pass
+
+
+class PromptLimitReachedException(Exception):
+    pass
+
+
+class JobQueueFullException(Exception):
+    pass
+
+
+class ScriptValidationError(Exception):
+    pass
+
+
+class RenderCancelledException(Exception):
+    pass
+
+
+class PatchApplyError(Exception):
+    pass
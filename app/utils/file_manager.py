@@ -0,0 +1,63 @@
+import os
+import time
+import shutil
+import logging
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_copy(src: Path, dest: Path) -> None:
+    """Copy src to dest via a temp file so readers never see a partial file."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+def touch(path: Path) -> None:
+    """Mark a file as recently used (LRU order is tracked by mtime)."""
+    try:
+        os.utime(path, None)
+    except FileNotFoundError:
+        pass
+
+
+def evict_lru(directory: Path, max_bytes: int, pattern: str = "*", min_age: float = 0,
+              keep: Optional[Callable[[Path], bool]] = None) -> int:
+    """
+    Delete least recently used files under `directory` until it fits in max_bytes.
+    - Files modified less than `min_age` seconds ago are never deleted (they may still be in use).
+    - Files for which `keep` returns True are pinned; they count towards the size but stay.
+    Returns the number of files removed.
+    """
+    entries: List[Tuple[float, int, Path]] = []
+    total = 0
+    cutoff = time.time() - min_age
+    for path in directory.rglob(pattern):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if not path.is_file():
+            continue
+        total += stat.st_size
+        if stat.st_mtime <= cutoff and not (keep and keep(path)):
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    removed = 0
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+            total -= size
+            removed += 1
+        except FileNotFoundError:
+            continue
+
+    if removed:
+        logger.info(f"Evicted {removed} files from {directory}")
+    return removed
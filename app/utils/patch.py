@@ -0,0 +1,102 @@
+import re
+from typing import List, Optional, Tuple
+from app.utils.exceptions import PatchApplyError
+
+_FENCED_DIFF = re.compile(r"```(?:diff|patch)?\s*\n(.*?)```", re.DOTALL)
+_HUNK_HEADER = re.compile(r"^@@(?: -(\d+)(?:,\d+)? \+\d+(?:,\d+)?)? @@")
+
+Hunk = Tuple[Optional[int], List[str], List[str]]  # (old start line, old lines, new lines)
+
+
+def extract_diff(text: str) -> str:
+    """Pull the unified diff out of an LLM reply (fenced or bare)."""
+    for block in _FENCED_DIFF.findall(text):
+        if "@@" in block:
+            return block
+    if "@@" in text:
+        return text
+    raise PatchApplyError("Response contains no diff hunks")
+
+
+def _is_file_header(lines: List[str], i: int, in_hunk: bool) -> bool:
+    """A "--- "/"+++ " pair; inside a hunk it may also be a removed "-- " and an added "++ " line."""
+    if not (lines[i].startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")):
+        return False
+    return not in_hunk or (i + 2 < len(lines) and lines[i + 2].startswith("@@"))
+
+
+def parse_hunks(diff: str) -> List[Hunk]:
+    hunks: List[Hunk] = []
+    lines = diff.rstrip("\n").splitlines()
+    current: Optional[Hunk] = None
+    for i, line in enumerate(lines):
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = (int(header.group(1)) if header.group(1) else None, [], [])
+            hunks.append(current)
+        elif _is_file_header(lines, i, in_hunk=current is not None):
+            current = None
+        elif current is None:
+            continue
+        elif line.startswith("\\"):
+            continue  # "\ No newline at end of file"
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+        else:
+            # Context line; models often drop the leading space of blank lines
+            text = line[1:] if line.startswith(" ") else line
+            current[1].append(text)
+            current[2].append(text)
+
+    if not hunks:
+        raise PatchApplyError("Diff contains no hunks")
+    return hunks
+
+
+def _find(lines: List[str], old: List[str], start: int, expected: Optional[int]) -> int:
+    """Index where `old` occurs in `lines` at or after `start`, closest to `expected`; -1 if absent."""
+    wanted = [line.rstrip() for line in old]
+    matches = [
+        i for i in range(start, len(lines) - len(old) + 1)
+        if [line.rstrip() for line in lines[i:i + len(old)]] == wanted
+    ]
+    if not matches:
+        return -1
+    if expected is None:
+        return matches[0]
+    return min(matches, key=lambda i: abs(i - expected))
+
+
+def apply_unified_diff(original: str, diff: str) -> str:
+    """
+    Apply a unified diff to `original`.
+    Hunks are located by their content (line numbers are only a hint, trailing whitespace
+    is ignored), so slightly off headers from an LLM still apply.
+    Raises PatchApplyError if a hunk's context cannot be found or the diff changes nothing.
+    """
+    lines = original.splitlines()
+    position = 0  # hunks apply in order; never match before the previous hunk
+    offset = 0    # line shift introduced by earlier hunks
+    for old_start, old, new in parse_hunks(diff):
+        expected = old_start - 1 + offset if old_start is not None else None
+        if old:
+            index = _find(lines, old, position, expected)
+            if index < 0:
+                raise PatchApplyError(f"Hunk does not apply: {old[0].strip()!r} not found")
+        elif expected is not None:
+            index = max(position, min(expected + 1, len(lines)))  # pure insertion after line old_start
+        else:
+            raise PatchApplyError("Insertion hunk without a line number")
+
+        lines[index:index + len(old)] = new
+        position = index + len(new)
+        offset += len(new) - len(old)
+
+    patched = "\n".join(lines)
+    if original.endswith("\n"):
+        patched += "\n"
+    if patched == original:
+        raise PatchApplyError("Diff leaves the script unchanged")
+    return patched
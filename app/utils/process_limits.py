@@ -0,0 +1,71 @@
+import os
+import sys
+import signal
+import resource
+import argparse
+from typing import List, Optional
+
+
+def apply_rlimits(cpu_seconds: Optional[int] = None, memory_mb: Optional[int] = None) -> None:
+    """
+    Cap CPU time and address space of the current process (and anything it spawns).
+    The CPU limit is relative to the CPU time already used, so long-lived workers can
+    call it before every job; only the soft limit moves, the hard limit stays untouched.
+    """
+    if cpu_seconds:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = int(usage.ru_utime + usage.ru_stime)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = used + cpu_seconds
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+    if memory_mb:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        soft = memory_mb * 1024 * 1024
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def kill_process_group(pid: int) -> None:
+    """SIGKILL a process group led by `pid` (started with start_new_session / setsid)."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def limited_command(command: List[str], cpu_seconds: Optional[int] = None,
+                    memory_mb: Optional[int] = None) -> List[str]:
+    """
+    Wrap `command` so it runs under the given limits.
+    The limits are applied by this module run as a launcher that then execs the command,
+    instead of a preexec_fn: code between fork and exec is unsafe in a multi-threaded server.
+    """
+    if not cpu_seconds and not memory_mb:
+        return command
+    launcher = [sys.executable, os.path.abspath(__file__)]
+    if cpu_seconds:
+        launcher += ["--cpu-seconds", str(cpu_seconds)]
+    if memory_mb:
+        launcher += ["--memory-mb", str(memory_mb)]
+    return launcher + ["--", *command]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a command under CPU time and address-space limits.")
+    parser.add_argument("--cpu-seconds", type=int)
+    parser.add_argument("--memory-mb", type=int)
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        parser.error("no command given")
+    apply_rlimits(cpu_seconds=args.cpu_seconds, memory_mb=args.memory_mb)
+    os.execvp(command[0], command)
+
+
+if __name__ == "__main__":
+    main()
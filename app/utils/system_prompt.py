@@ -31,6 +31,23 @@ Requirements:
 Only return the Python code as specified.
 """
 
+# Short instruction for the stateless repair channel; the failing script carries all needed context
+REPAIR_PROMPT = """
+You fix Manim Community v0.19 scripts that failed to render.
+You get the failing script and the error. Fix that error with the smallest change, keep everything else as is.
+Keep `from manim import *`, the Scene subclasses and their construct(self) methods. Escape LaTeX backslashes or use raw strings.
+Return only the complete corrected Python code, no explanations and no markdown.
+"""
+
+# Diff variant: the reply size scales with the fix, not with the script
+REPAIR_DIFF_PROMPT = """
+You fix Manim Community v0.19 scripts that failed to render.
+You get the failing script and the error. Fix that error with the smallest change, keep everything else as is.
+Escape LaTeX backslashes or use raw strings.
+Return only a unified diff against the given script in a single ```diff block: `@@ -start,count +start,count @@`
+hunk headers, 2 lines of unchanged context around each change, no explanations.
+"""
+
 
 def build_prompt() -> str:
     user_prompt = f"""
@@ -0,0 +1,37 @@
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Encoding of the GPT-4o family served by the Azure deployment
+ENCODING_NAME = "o200k_base"
+
+_encoding = None
+_encoding_loaded = False
+_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; None if tiktoken or its BPE file is unavailable."""
+    global _encoding, _encoding_loaded
+    with _lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(ENCODING_NAME)
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+                _encoding = None
+            _encoding_loaded = True
+        return _encoding
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Number of tokens `text` costs in a prompt."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
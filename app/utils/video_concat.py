@@ -0,0 +1,34 @@
+import av
+from pathlib import Path
+from typing import List
+
+
+def concat_videos(inputs: List[Path], output: Path) -> None:
+    """
+    Join videos with identical encoding settings (e.g. scenes of one manim render)
+    by remuxing their packets back to back. Nothing is decoded or re-encoded.
+    Only the video stream is kept.
+    """
+    if not inputs:
+        raise ValueError("No videos to concatenate.")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with av.open(str(output), mode="w") as out:
+        with av.open(str(inputs[0])) as first:
+            out_stream = out.add_stream(template=first.streams.video[0])
+
+        offset_seconds = 0.0
+        for path in inputs:
+            with av.open(str(path)) as src:
+                in_stream = src.streams.video[0]
+                segment_end = offset_seconds
+                for packet in src.demux(in_stream):
+                    if packet.dts is None:  # demuxer flush packet
+                        continue
+                    shift = int(round(offset_seconds / packet.time_base))
+                    packet.pts += shift
+                    packet.dts += shift
+                    segment_end = max(segment_end, float((packet.pts + packet.duration) * packet.time_base))
+                    packet.stream = out_stream
+                    out.mux(packet)
+                offset_seconds = segment_end
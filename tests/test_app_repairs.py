@@ -0,0 +1,132 @@
+import sys
+import asyncio
+import threading
+import types
+import importlib
+from types import SimpleNamespace
+
+import pytest
+
+from app.config.app_config import get_default_config
+from app.services.script_preflight import ScriptPreflight
+
+FENCED_REPLY = """```python
+class Demo(Scene):
+    def construct(self):
+        self.play(ShowCreation(Square()))
+```"""
+WORKING_SCRIPT = "from manim import *\n\nclass Demo(Scene):\n    def construct(self):\n        pass\n"
+
+
+class FakeChatApplication:
+    def __init__(self):
+        self.repairs = []
+        self.replaced = []
+
+    def repair(self, repair_request, instructions=None):
+        self.repairs.append(repair_request)
+        return SimpleNamespace(content=WORKING_SCRIPT)
+
+    def replace_last_response(self, session_id, user_id, ai_content):
+        self.replaced.append(ai_content)
+        return True
+
+    async def astream_chat(self, session_id, user_id, user_input):
+        for chunk in ("Sure:\n```python\nfrom manim import *\n", "class Demo(Scene):\n    def construct(self):\n        pass\n```\n", "Done."):
+            yield chunk
+
+
+class FakeWorkspace:
+    output_id = "out"
+    cancelled = False
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # app.core.app reads the process-wide AppContext at import time, which connects to Postgres
+    context = SimpleNamespace(chat_application=FakeChatApplication(), system_prompt="", config=get_default_config(),
+                              render_cache=None, prompt_cache=SimpleNamespace(enabled=False), worker_pool=None,
+                              tex_cache=SimpleNamespace(prune=lambda: None))
+    monkeypatch.setitem(sys.modules, "app.core.app_context", types.SimpleNamespace(app_context=context))
+    monkeypatch.delitem(sys.modules, "app.core.app", raising=False)
+    monkeypatch.setattr(ScriptPreflight, "_manim_names", {"Scene", "Square", "Create"})
+    app = importlib.import_module("app.core.app").App()
+    app.rendered = []
+
+    def render(script_cleaned, scene_names, workspace, skip_dry_run=False):
+        app.rendered.append(script_cleaned)
+        return True, None
+
+    monkeypatch.setattr(app, "render", render)
+    return app
+
+
+def test_fenced_reply_failing_preflight_is_fixed_locally(app):
+    result = app.run_with_repairs(FENCED_REPLY, "s", "u", FakeWorkspace())
+
+    assert result["success"] and result["attempts"] == 2
+    assert result["script_cleaned"].startswith("from manim import *\n")
+    assert "self.play(Create(Square()))" in result["script_cleaned"]
+    assert app._chatapp.repairs == []
+
+
+def test_render_limits_scale_with_the_target_preset(app):
+    preview = SimpleNamespace(quality="l", frame_rate=10)
+    final = SimpleNamespace(quality="h", frame_rate=None)
+
+    assert app.render_limits(preview) == (app.render_timeout, app.render_cpu_seconds, app.render_memory_mb)
+    timeout, cpu_seconds, memory_mb = app.render_limits(final)
+    assert timeout >= app.render_timeout * 30 and cpu_seconds >= app.render_cpu_seconds * 30
+    assert memory_mb >= app.render_memory_mb * 5
+
+
+def test_streamed_script_is_preflighted_off_the_event_loop(app, monkeypatch):
+    check = app.preflight.check
+    threads = []
+
+    def recording_check(code):
+        threads.append(threading.current_thread())
+        return check(code)
+
+    monkeypatch.setattr(app.preflight, "check", recording_check)
+
+    async def main():
+        return [event async for event in app.astream_script("s", "u", "a square")]
+
+    events = asyncio.run(main())
+
+    assert ("preflight", {"ok": True, "scenes": ["Demo"]}) in events
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_repaired_script_replaces_the_stored_reply(app):
+    result = app.generate_script("s", "u", prompt="a square", script_content=FENCED_REPLY)
+
+    assert result["attempts"] == 2
+    assert app._chatapp.replaced == [result["script_cleaned"]]
+
+
+def test_script_that_rendered_first_time_is_kept(app):
+    app.generate_script("s", "u", prompt="a square", script_content=WORKING_SCRIPT)
+
+    assert app._chatapp.replaced == []
+
+
+def test_failed_speculative_candidates_count_against_the_attempt_budget(app, monkeypatch):
+    app.speculative_candidates = 2
+    app._chatapp.generate_candidates = lambda session_id, user_id, user_input, n: [
+        SimpleNamespace(content=WORKING_SCRIPT) for _ in range(n)
+    ]
+    app._chatapp.record_exchange = lambda **kwargs: None
+
+    def render(script_cleaned, scene_names, workspace, skip_dry_run=False):
+        app.rendered.append(script_cleaned)
+        return False, "RuntimeError: broken"
+
+    monkeypatch.setattr(app, "render", render)
+    result = app.generate_script("s", "u", prompt="a square")
+
+    assert not result["success"]
+    assert result["attempts"] == app.max_retry_attempts
+    # Both candidates once, then the repaired first candidate for the remaining attempts
+    assert len(app.rendered) == 2 + app.max_retry_attempts - 1
@@ -0,0 +1,40 @@
+from app.utils.code_stream import FencedCodeExtractor
+
+REPLY = "Here is the scene:\n```python\nfrom manim import *\n\nclass Demo(Scene):\n    pass\n```\nEnjoy!"
+CODE = "from manim import *\n\nclass Demo(Scene):\n    pass"
+
+
+def feed_all(chunks):
+    extractor = FencedCodeExtractor()
+    results = [extractor.feed(chunk) for chunk in chunks]
+    return extractor, [result for result in results if result is not None]
+
+
+def test_code_is_returned_once_on_the_closing_chunk():
+    chunks = [REPLY[:30], REPLY[30:REPLY.index("```\n") + 3], REPLY[REPLY.index("```\n") + 3:]]
+    extractor, found = feed_all(chunks)
+    assert found == [CODE]
+    assert extractor.code == CODE
+    assert extractor.text == REPLY
+
+
+def test_fences_split_across_single_character_chunks():
+    _, found = feed_all(list(REPLY))
+    assert found == [CODE]
+
+
+def test_only_the_first_block_is_extracted():
+    _, found = feed_all([REPLY + "\n```python\nsecond = 2\n```\n"])
+    assert found == [CODE]
+
+
+def test_unclosed_block_returns_nothing():
+    extractor, found = feed_all(["```python\nfrom manim import *\n", "class Demo(Scene):\n"])
+    assert found == []
+    assert extractor.code is None
+
+
+def test_text_without_fences():
+    extractor, found = feed_all(["Sorry, ", "I can't help with that."])
+    assert found == []
+    assert extractor.text == "Sorry, I can't help with that."
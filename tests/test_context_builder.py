@@ -0,0 +1,62 @@
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+from app.services.context_builder import ContextBuilder
+
+
+class FakeRedisManager:
+    def __init__(self, summary=None):
+        self.summary = summary
+
+    def get_summary(self, session_id, user_id):
+        return self.summary
+
+    def set_summary(self, session_id, user_id, summary):
+        self.summary = summary
+
+
+class FakeLLM:
+    def __init__(self):
+        self.requests = []
+
+    def invoke(self, messages):
+        self.requests.append(messages[-1].content)
+        return AIMessage(content=f"summary {len(self.requests)}")
+
+
+def history(first, last):
+    return [(HumanMessage if seq % 2 else AIMessage)(content=f"message {seq}",
+                                                     response_metadata={"tokens": 10, "seq": seq})
+            for seq in range(first, last + 1)]
+
+
+def test_summary_points_at_the_last_summarized_seq():
+    redis_manager, llm = FakeRedisManager(), FakeLLM()
+    builder = ContextBuilder(redis_manager, llm, max_history_tokens=20, min_recent_messages=2)
+
+    messages = builder.build("s", "u", history(1, 6))
+
+    assert redis_manager.summary == {"text": "summary 1", "last_seq": 4}
+    assert isinstance(messages[0], SystemMessage) and "summary 1" in messages[0].content
+    assert [message.content for message in messages[1:]] == ["message 5", "message 6"]
+
+
+def test_only_messages_after_the_pointer_are_summarized():
+    redis_manager, llm = FakeRedisManager({"text": "earlier", "last_seq": 4}), FakeLLM()
+    builder = ContextBuilder(redis_manager, llm, max_history_tokens=20, min_recent_messages=2)
+
+    # The window moved on: 1 and 2 were trimmed, 5 and 6 are now old enough to summarize
+    builder.build("s", "u", history(3, 8))
+
+    assert "message 4" not in llm.requests[0]
+    assert "message 5" in llm.requests[0] and "message 6" in llm.requests[0]
+    assert redis_manager.summary == {"text": "summary 1", "last_seq": 6}
+
+
+def test_repeated_content_is_not_mistaken_for_the_pointer():
+    redis_manager, llm = FakeRedisManager({"text": "earlier", "last_seq": 2}), FakeLLM()
+    builder = ContextBuilder(redis_manager, llm, max_history_tokens=20, min_recent_messages=2)
+    repeated = [HumanMessage(content="again", response_metadata={"tokens": 10, "seq": seq}) for seq in range(1, 7)]
+
+    builder.build("s", "u", repeated)
+
+    assert llm.requests[0].count("User: again") == 2  # seqs 3 and 4
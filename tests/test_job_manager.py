@@ -0,0 +1,69 @@
+import threading
+
+from app.services.job_manager import JobManager
+
+
+def run_job(preview_settings_key, quality, default_quality=None):
+    """Runs one job to completion; returns it and the qualities it was upgraded to."""
+    upgraded = []
+
+    def handler(session_id, user_id, prompt, cancel_event, script):
+        return {"success": True, "script_cleaned": "code", "filename": "preview", "quality": "l",
+                "settings_key": preview_settings_key}
+
+    def upgrade_handler(script, output_id, quality, cancel_event):
+        upgraded.append(quality)
+        return {"success": True, "filename": f"{output_id}_{quality}", "quality": quality,
+                "settings_key": f"{quality}@15"}
+
+    manager = JobManager(handler, upgrade_handler, max_workers=1, default_quality=default_quality)
+    job = manager.submit(session_id="s", user_id="u", prompt="p", quality=quality)
+    manager.tasks.join()
+    manager.upgrades.join()
+    return job, upgraded
+
+
+def test_reduced_frame_rate_preview_is_upgraded_at_the_same_quality():
+    job, upgraded = run_job("l@10", "l")
+    assert upgraded == ["l"]
+    assert job.upgrade_status == "completed"
+    assert job.result["filename"] == "preview_l"
+    assert job.result["preview_filename"] == "preview"
+
+
+def test_preview_at_final_settings_is_not_upgraded():
+    job, upgraded = run_job("l@15", "l")
+    assert upgraded == []
+    assert job.upgrade_status is None
+    assert job.result["filename"] == "preview"
+
+
+def test_reduced_frame_rate_preview_is_upgraded_to_the_default_quality():
+    job, upgraded = run_job("l@10", None, default_quality="l")
+    assert upgraded == ["l"]
+    assert job.result["settings_key"] == "l@15"
+
+
+def test_generation_runs_while_an_upgrade_is_rendering():
+    started, release = threading.Event(), threading.Event()
+
+    def handler(session_id, user_id, prompt, cancel_event, script):
+        return {"success": True, "script_cleaned": "code", "filename": prompt, "quality": "l",
+                "settings_key": "l@10"}
+
+    def upgrade_handler(script, output_id, quality, cancel_event):
+        started.set()
+        release.wait(5)
+        return {"success": True, "filename": f"{output_id}_{quality}", "quality": quality,
+                "settings_key": f"{quality}@15"}
+
+    manager = JobManager(handler, upgrade_handler, max_workers=1, default_quality="l")
+    first = manager.submit(session_id="s", user_id="u", prompt="first")
+    assert started.wait(5)
+    second = manager.submit(session_id="s", user_id="u", prompt="second")
+    manager.tasks.join()
+
+    assert (first.upgrade_status, second.status) == ("running", "completed")
+    release.set()
+    manager.upgrades.join()
+    assert first.upgrade_status == second.upgrade_status == "completed"
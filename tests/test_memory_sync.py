@@ -0,0 +1,139 @@
+from app.services.memory_manager import MemoryManager
+
+
+class FakeRedisManager:
+    """Counter and history per session; get_sync_state returns the entries after the synced-through seq."""
+
+    def __init__(self, sessions, states):
+        self.sessions = sessions
+        self.states = states
+        self.marks = {}
+        self.synced = []
+
+    def iter_dirty_sessions(self, batch_size=200):
+        yield list(self.sessions)
+
+    def get_sync_state(self, sessions):
+        states = []
+        for user_id, session_id in sessions:
+            count, entries = self.states[(user_id, session_id)]
+            mark = self.marks.get((user_id, session_id), 0)
+            states.append((count, mark, [entry for entry in entries if entry["seq"] > mark]))
+        return states
+
+    def mark_synced(self, session_id, user_id, seq):
+        self.marks[(user_id, session_id)] = max(seq, self.marks.get((user_id, session_id), 0))
+        self.synced.append((session_id, user_id, seq))
+        return True
+
+    def replace_last_ai_message(self, session_id, user_id, content):
+        count, entries = self.states[(user_id, session_id)]
+        for entry in reversed(entries):
+            if entry["type"] == "ai":
+                entry["content"] = content
+                return dict(entry)
+        return None
+
+
+class FakeDatabaseManager:
+    """insert_messages with ON CONFLICT DO NOTHING semantics, keyed by message id."""
+
+    def __init__(self, rows=()):
+        self.rows = {row["id"]: row for row in rows}
+        self.sent = []
+
+    def insert_messages(self, rows, replace=False):
+        self.sent.append([row["id"] for row in rows])
+        inserted = 0
+        for row in rows:
+            if row["id"] not in self.rows:
+                self.rows[row["id"]] = row
+                inserted += 1
+            elif replace:
+                self.rows[row["id"]]["content"] = row["content"]
+        return inserted
+
+
+def entry(seq):
+    return {"id": f"m{seq}", "type": "human" if seq % 2 else "ai", "content": f"message {seq}", "seq": seq,
+            "timestamp": f"2026-01-01T12:00:0{seq}"}
+
+
+def test_sync_fills_sequence_gaps():
+    # Postgres has seqs 1, 2, 4 (the append of 3 failed); Redis has 1..5
+    db = FakeDatabaseManager(
+        {"id": f"m{seq}", "session_id": "s", "user_id": "u", "role": "human", "content": f"message {seq}"}
+        for seq in (1, 2, 4)
+    )
+    redis_manager = FakeRedisManager([("u", "s")], {("u", "s"): (5, [entry(seq) for seq in range(1, 6)])})
+
+    inserted = MemoryManager(db, redis_manager).sync_redis_to_postgres()
+
+    assert inserted == 2
+    assert sorted(db.rows) == ["m1", "m2", "m3", "m4", "m5"]
+    # Recovered messages keep their append time, so they sort before the ones appended after them
+    assert db.rows["m3"]["timestamp"] == "2026-01-01T12:00:03"
+    assert redis_manager.synced == [("s", "u", 5)]
+
+
+def test_sync_is_idempotent():
+    db = FakeDatabaseManager()
+    redis_manager = FakeRedisManager([("u", "s")], {("u", "s"): (2, [entry(1), entry(2)])})
+    memory_manager = MemoryManager(db, redis_manager)
+
+    assert memory_manager.sync_redis_to_postgres() == 2
+    assert memory_manager.sync_redis_to_postgres() == 0
+    assert len(db.rows) == 2
+
+
+def test_sync_sends_only_entries_after_the_synced_mark():
+    db = FakeDatabaseManager()
+    state = {("u", "s"): (2, [entry(1), entry(2)])}
+    redis_manager = FakeRedisManager([("u", "s")], state)
+    memory_manager = MemoryManager(db, redis_manager)
+    memory_manager.sync_redis_to_postgres()
+
+    state[("u", "s")] = (4, [entry(seq) for seq in range(1, 5)])
+    assert memory_manager.sync_redis_to_postgres() == 2
+    assert db.sent == [["m1", "m2"], ["m3", "m4"]]
+    assert redis_manager.synced == [("s", "u", 2), ("s", "u", 4)]
+
+
+def test_failed_insert_leaves_the_mark_alone():
+    class FailingDatabaseManager(FakeDatabaseManager):
+        def insert_messages(self, rows):
+            raise RuntimeError("postgres down")
+
+    redis_manager = FakeRedisManager([("u", "s")], {("u", "s"): (2, [entry(1), entry(2)])})
+
+    assert MemoryManager(FailingDatabaseManager(), redis_manager).sync_redis_to_postgres() == 0
+    assert redis_manager.marks == {}
+
+
+def test_sync_clears_sessions_without_redis_state():
+    redis_manager = FakeRedisManager([("u", "gone")], {("u", "gone"): (None, [])})
+
+    assert MemoryManager(FakeDatabaseManager(), redis_manager).sync_redis_to_postgres() == 0
+    assert redis_manager.synced == [("gone", "u", 0)]
+
+
+def test_replacing_the_last_ai_message_keeps_the_sequence():
+    db = FakeDatabaseManager([{"id": "m2", "session_id": "s", "user_id": "u", "role": "ai", "content": "message 2"}])
+    redis_manager = FakeRedisManager([("u", "s")], {("u", "s"): (3, [entry(seq) for seq in range(1, 4)])})
+    memory_manager = MemoryManager(db, redis_manager)
+
+    assert memory_manager.replace_last_ai_message("s", "u", "repaired") is True
+
+    assert db.rows["m2"]["content"] == "repaired"
+    assert [e["content"] for e in redis_manager.states[("u", "s")][1]] == ["message 1", "repaired", "message 3"]
+    # An unsynced original is inserted with the new content; the sync's later insert is skipped
+    assert memory_manager.sync_redis_to_postgres() == 3 - 1
+    assert db.rows["m2"]["content"] == "repaired"
+
+
+def test_nothing_to_replace_without_an_ai_message():
+    redis_manager = FakeRedisManager([("u", "s")], {("u", "s"): (1, [entry(1)])})
+    db = FakeDatabaseManager()
+
+    assert MemoryManager(db, redis_manager).replace_last_ai_message("s", "u", "repaired") is False
+    assert db.sent == []
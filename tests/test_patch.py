@@ -0,0 +1,68 @@
+import pytest
+
+from app.utils.exceptions import PatchApplyError
+from app.utils.patch import apply_unified_diff, extract_diff, parse_hunks
+
+SCRIPT = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        circle = Circle()
+        self.play(Create(circle))
+"""
+
+
+def test_extract_diff_from_fenced_reply():
+    reply = "Here is the fix:\n```diff\n@@ -1 +1 @@\n-a\n+b\n```\nDone."
+    assert extract_diff(reply) == "@@ -1 +1 @@\n-a\n+b\n"
+
+
+def test_extract_diff_without_hunks_raises():
+    with pytest.raises(PatchApplyError):
+        extract_diff("```python\nprint('hi')\n```")
+
+
+def test_apply_replaces_line():
+    diff = """--- a/scene.py
++++ b/scene.py
+@@ -5,2 +5,2 @@
+         circle = Circle()
+-        self.play(Create(circle))
++        self.play(FadeIn(circle))
+"""
+    patched = apply_unified_diff(SCRIPT, diff)
+    assert "self.play(FadeIn(circle))" in patched
+    assert "Create(circle)" not in patched
+    assert patched.endswith("\n")
+
+
+def test_apply_tolerates_wrong_line_numbers_and_trailing_whitespace():
+    diff = "@@ -40,1 +40,1 @@\n-        circle = Circle()   \n+        circle = Circle(color=RED)\n"
+    assert "Circle(color=RED)" in apply_unified_diff(SCRIPT, diff)
+
+
+def test_apply_pure_insertion():
+    diff = "@@ -5,0 +6,1 @@\n+        circle.shift(LEFT)\n"
+    lines = apply_unified_diff(SCRIPT, diff).splitlines()
+    assert lines[5] == "        circle.shift(LEFT)"
+
+
+def test_hunk_removing_and_adding_dashed_lines_is_not_a_file_header():
+    original = "x = 1\n-- old\ny = 2\n"
+    diff = "@@ -1,3 +1,3 @@\n x = 1\n--- old\n+++ new\n y = 2\n"
+    assert apply_unified_diff(original, diff) == "x = 1\n++ new\ny = 2\n"
+
+
+def test_file_header_between_hunks():
+    diff = "--- a/s.py\n+++ b/s.py\n@@ -1 +1 @@\n-a\n+b\n--- a/s.py\n+++ b/s.py\n@@ -3 +3 @@\n-c\n+d\n"
+    assert [(old, new) for _, old, new in parse_hunks(diff)] == [(["a"], ["b"]), (["c"], ["d"])]
+
+
+def test_missing_context_raises():
+    with pytest.raises(PatchApplyError):
+        apply_unified_diff(SCRIPT, "@@ -1 +1 @@\n-not in the script\n+x\n")
+
+
+def test_diff_that_changes_nothing_raises():
+    with pytest.raises(PatchApplyError):
+        apply_unified_diff(SCRIPT, "@@ -5,1 +5,1 @@\n         circle = Circle()\n")
@@ -0,0 +1,79 @@
+from app.services.render_errors import OutputTail, RenderError
+
+SCRIPT = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        self.play(Create(undefined_square))
+"""
+
+
+def test_output_tail_keeps_the_last_lines_cut_short():
+    tail = OutputTail(max_lines=2, max_line_chars=5)
+    for line in ("first\n", "second\n", "third line\n"):
+        tail.append(line)
+    assert list(tail) == ["secon", "third"]
+
+
+def test_from_output_parses_a_plain_traceback(tmp_path):
+    script = tmp_path / "scene.py"
+    script.write_text(SCRIPT)
+    output = [
+        "Traceback (most recent call last):\n",
+        '  File "/usr/lib/manim/cli.py", line 80, in render\n',
+        f'  File "{script}", line 5, in construct\n',
+        "NameError: name 'undefined_square' is not defined\n",
+    ]
+
+    error = RenderError.from_output(output, str(script))
+
+    assert (error.kind, error.exception_type, error.line) == ("exception", "NameError", 5)
+    assert error.message == "name 'undefined_square' is not defined"
+    assert error.source_line == "self.play(Create(undefined_square))"
+
+
+def test_from_output_parses_a_rich_traceback():
+    output = [
+        "\x1b[31m╭──── Traceback (most recent call last) ────╮\x1b[0m",
+        "│ /tmp/render-1/scripts/scene.py:5 in construct │",
+        "╰───────────────────────────────────────────╯",
+        "ValueError: bad value",
+    ]
+
+    error = RenderError.from_output(output, "/elsewhere/scene.py")
+
+    assert (error.exception_type, error.message, error.line) == ("ValueError", "bad value", 5)
+
+
+def test_from_output_extracts_the_latex_error():
+    output = ["Writing to media/Tex/abc.tex", "! Undefined control sequence.", "l.8 \\fra", "c{a}{b}",
+              "ValueError: latex error converting to dvi. See log output above or the log file"]
+
+    error = RenderError.from_output(output)
+
+    assert error.kind == "latex"
+    assert error.latex_excerpt.startswith("! Undefined control sequence.")
+    assert "How to fix" in str(error)
+
+
+def test_from_output_without_an_exception_keeps_the_last_lines():
+    error = RenderError.from_output([""])
+    assert error.message == "manim exited without output"
+
+
+def test_from_exception_points_at_the_script_frame(tmp_path):
+    script = tmp_path / "scene.py"
+    script.write_text("def construct():\n    return 1 / 0\n")
+    try:
+        exec(compile(script.read_text(), str(script), "exec"), namespace := {})
+        namespace["construct"]()
+    except ZeroDivisionError as e:
+        error = RenderError.from_exception(e, str(script))
+
+    assert (error.kind, error.exception_type, error.line) == ("exception", "ZeroDivisionError", 2)
+    assert error.source_line == "return 1 / 0"
+
+
+def test_limit_errors_carry_a_hint():
+    error = RenderError.limit("timeout", "Render timed out after 120s")
+    assert str(error).startswith("[timeout] Render timed out after 120s\nHow to fix: ")
@@ -0,0 +1,61 @@
+from app.services.script_autofix import ScriptAutoFixer
+
+SCRIPT = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        square = Square()
+        self.play(ShowCreation(square))
+"""
+
+
+def test_renamed_names_are_rewritten():
+    fixed, applied = ScriptAutoFixer().fix(SCRIPT, "NameError: name 'ShowCreation' is not defined")
+    assert "self.play(Create(square))" in fixed
+    assert applied == ["renamed_names"]
+
+
+def test_names_bound_by_the_script_are_left_alone():
+    script = SCRIPT.replace("class Demo", "def ShowCreation(mobject):\n    return Create(mobject)\n\nclass Demo")
+    assert ScriptAutoFixer().fix(script, "some error") is None
+
+
+def test_renamed_attribute_only_when_the_error_names_it():
+    script = SCRIPT.replace("self.play(ShowCreation(square))", "graph = axes.get_graph(lambda x: x)")
+    fixer = ScriptAutoFixer()
+    assert fixer.fix(script, "TypeError: bad argument") is None
+
+    fixed, applied = fixer.fix(script, "AttributeError: 'Axes' object has no attribute 'get_graph'")
+    assert "axes.plot(lambda x: x)" in fixed
+    assert applied == ["renamed_attributes"]
+
+
+def test_missing_manim_import_is_added():
+    script = SCRIPT.replace("from manim import *\n", "")
+    fixed, applied = ScriptAutoFixer().fix(script, "NameError: name 'Scene' is not defined")
+    assert fixed.startswith("from manim import *\n")
+    assert "missing_manim_import" in applied
+
+
+def test_latex_strings_become_raw():
+    script = SCRIPT.replace("self.play(ShowCreation(square))", 'self.add(MathTex("\\frac{a}{b}"))')
+    fixed, applied = ScriptAutoFixer().fix(script, "LaTeX compilation error")
+    assert 'MathTex(r"\\frac{a}{b}")' in fixed
+    assert applied == ["unescaped_latex"]
+
+
+def test_escaped_latex_is_kept():
+    script = SCRIPT.replace("self.play(ShowCreation(square))", 'self.add(MathTex("\\\\frac{a}{b}"))')
+    assert ScriptAutoFixer().fix(script, "LaTeX compilation error") is None
+
+
+def test_unparsable_script_is_not_fixed():
+    assert ScriptAutoFixer().fix("def broken(:\n", "SyntaxError") is None
+
+
+def test_stats_count_attempts_and_rules():
+    fixer = ScriptAutoFixer()
+    fixer.fix(SCRIPT, "NameError: name 'ShowCreation' is not defined")
+    fixer.fix("x = 1\n", "ValueError")
+
+    assert fixer.stats() == {"attempts": 2, "resolved": 1, "hit_rate": 0.5, "rules": {"renamed_names": 1}}
@@ -0,0 +1,71 @@
+import pytest
+
+from app.services.script_preflight import ScriptPreflight
+from app.utils.exceptions import ScriptValidationError
+
+SCRIPT = """from manim import *
+
+class Base(Scene):
+    def setup(self):
+        self.title = Text("Demo")
+
+class Demo(Base):
+    def construct(self):
+        square = Square()
+        self.play(Create(square))
+"""
+
+
+@pytest.fixture(autouse=True)
+def manim_api(monkeypatch):
+    # A fixed Manim API, independent of the installed version
+    monkeypatch.setattr(ScriptPreflight, "_manim_names", {"Scene", "Text", "Square", "Create"})
+
+
+def problems(script):
+    with pytest.raises(ScriptValidationError) as error:
+        ScriptPreflight().check(script)
+    return str(error.value)
+
+
+def test_returns_rendered_scenes_but_not_their_base_classes():
+    assert ScriptPreflight().check(SCRIPT) == ["Demo"]
+
+
+def test_syntax_error():
+    assert "SyntaxError" in problems("class Demo(Scene:\n")
+
+
+def test_scene_without_construct():
+    assert "has no construct(self) method" in problems("from manim import *\n\nclass Demo(Scene):\n    pass\n")
+
+
+def test_no_scene():
+    assert "No Manim Scene subclass found" in problems("from manim import *\n\nsquare = Square()\n")
+
+
+def test_forbidden_imports_calls_and_attributes_are_all_reported():
+    script = SCRIPT + "\nimport os.path\nopen('x')\nprint.__globals__\n"
+    message = problems(script)
+    assert "Forbidden import 'os.path'" in message
+    assert "Forbidden call 'open()'" in message
+    assert "Forbidden attribute access '__globals__'" in message
+
+
+def test_missing_manim_import():
+    assert "Missing `from manim import *`" in problems(SCRIPT.replace("from manim import *\n", "from math import pi\n"))
+
+
+def test_unknown_name_is_reported_once():
+    script = SCRIPT.replace("self.play(Create(square))", "self.play(ShowCreation(square), ShowCreation(square))")
+    assert problems(script).count("'ShowCreation'") == 1
+
+
+def test_names_bound_in_the_script_are_known():
+    script = SCRIPT.replace("square = Square()", "square = Square()\n        for i, item in enumerate([square]):\n            pass")
+    assert ScriptPreflight().check(script) == ["Demo"]
+
+
+def test_name_checks_skipped_without_manim(monkeypatch):
+    monkeypatch.setattr(ScriptPreflight, "_manim_names", set())
+    assert ScriptPreflight().check(SCRIPT.replace("Create(square)", "ShowCreation(square)")) == ["Demo"]
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.session_cache import SessionCache
+
+CREATED_AT = datetime(2026, 1, 1, 12, 0)
+
+
+class FakeRedis:
+    """Hash commands of a Redis client, storing bytes like redis-py returns them."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.reads = 0
+
+    def hset(self, key, mapping):
+        self.hashes[key] = {k.encode(): v.encode() for k, v in mapping.items()}
+
+    def hgetall(self, key):
+        self.reads += 1
+        return dict(self.hashes.get(key, {}))
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+
+class FakeAsyncRedis(FakeRedis):
+    async def hset(self, key, mapping):
+        FakeRedis.hset(self, key, mapping)
+
+    async def hgetall(self, key):
+        return FakeRedis.hgetall(self, key)
+
+    async def delete(self, key):
+        FakeRedis.delete(self, key)
+
+
+class FakeDatabaseManager:
+    def __init__(self):
+        self.lookups = 0
+
+    def get_chat_session(self, session_id, user_id):
+        self.lookups += 1
+        if user_id != "owner":
+            raise ValueError(f"Session {session_id} not found or not owned by user {user_id}")
+        return SimpleNamespace(user_id="owner", name="Demo", created_at=CREATED_AT)
+
+    async def aget_chat_session(self, session_id, user_id):
+        return self.get_chat_session(session_id, user_id)
+
+
+@pytest.fixture
+def cache():
+    return SessionCache(FakeRedis(), FakeAsyncRedis(), FakeDatabaseManager())
+
+
+def test_miss_reads_postgres_once_then_hits_l1(cache):
+    meta = cache.verify("s", "owner")
+    assert meta == {"user_id": "owner", "name": "Demo", "created_at": CREATED_AT.isoformat()}
+
+    cache.verify("s", "owner")
+    assert cache.db_manager.lookups == 1
+    assert cache.client.reads == 1
+
+
+def test_l2_hit_fills_l1(cache):
+    cache.client.hset(cache.get_meta_key("s"),
+                      mapping={"user_id": "owner", "name": "Demo", "created_at": CREATED_AT.isoformat()})
+
+    assert cache.verify("s", "owner")["name"] == "Demo"
+    assert cache.verify("s", "owner")["name"] == "Demo"
+    assert cache.client.reads == 1
+    assert cache.db_manager.lookups == 0
+
+
+def test_cached_session_of_another_user_is_rejected(cache):
+    cache.verify("s", "owner")
+    with pytest.raises(ValueError):
+        cache.verify("s", "intruder")
+
+
+def test_expired_l1_entry_is_read_again(cache):
+    cache.l1_ttl = -1
+    cache.verify("s", "owner")
+    cache.verify("s", "owner")
+    assert cache.client.reads == 2
+
+
+def test_l1_evicts_least_recently_used(cache):
+    cache.l1_max_entries = 2
+    for session_id in ("a", "b", "c"):
+        cache._l1_put(session_id, {"user_id": "owner"})
+    assert list(cache.l1) == ["b", "c"]
+
+
+def test_async_verify_and_invalidate(cache):
+    async def main():
+        await cache.averify("s", "owner")
+        await cache.ainvalidate("s")
+        return cache.l1, cache.aclient.hashes
+
+    assert asyncio.run(main()) == ({}, {})
+    assert cache.db_manager.lookups == 1
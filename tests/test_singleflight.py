@@ -0,0 +1,91 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return "history"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(flight.do, "session", load)
+        while not calls:
+            time.sleep(0.001)
+        followers = [executor.submit(flight.do, "session", load) for _ in range(3)]
+        time.sleep(0.05)  # let the followers reach the wait
+        release.set()
+        results = [future.result(timeout=5) for future in [leader, *followers]]
+
+    assert results == ["history"] * 4
+    assert len(calls) == 1
+    assert flight._calls == {}
+
+
+def test_error_is_raised_and_the_key_released():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("postgres down")
+
+    with pytest.raises(ValueError):
+        flight.do("session", fail)
+    assert flight.do("session", lambda: "recovered") == "recovered"
+
+
+def test_async_waiters_share_the_leaders_result():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "history"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("session", load) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["history"] * 5
+    assert len(calls) == 1
+    assert flight._calls == {}
+
+
+def test_async_error_reaches_every_waiter():
+    flight = AsyncSingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("postgres down")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("session", fail) for _ in range(3)), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [ValueError] * 3
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = AsyncSingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.02)
+        return "history"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("session", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do("session", load))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return await leader, waiter.cancelled()
+
+    assert asyncio.run(main()) == ("history", True)
@@ -0,0 +1,34 @@
+import os
+import sys
+import time
+
+from app.services.tex_cache import WARM_MANIFEST, TexCache
+
+
+def write(directory, name, age):
+    path = directory / name
+    path.write_bytes(b"x" * 100)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_keeps_the_warm_corpus_and_recent_compiles(tmp_path):
+    cache = TexCache(str(tmp_path), max_bytes=200, min_age=60)
+    warm = write(tmp_path, "warm.svg", age=3600)
+    old = write(tmp_path, "old.svg", age=1800)
+    fresh = write(tmp_path, "fresh.tex", age=1)
+    (tmp_path / WARM_MANIFEST).write_text("warm\n")
+
+    assert cache.prune() == 1
+    assert warm.exists() and fresh.exists() and not old.exists()
+
+
+def test_warm_up_process_is_reaped(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "executable", "true")
+    process = TexCache(str(tmp_path)).start_warm_up()
+
+    deadline = time.monotonic() + 5
+    while process.returncode is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert process.returncode == 0